@@ -0,0 +1,68 @@
+# batching.py
+#
+# Micro-batching for the API: requests that arrive within a few milliseconds
+# of each other are scored with one vectorized call on the scoring executor,
+# and each caller gets back its own result (or its own error).
+
+import asyncio
+
+
+class MicroBatcher:
+    """Collects records for up to `window_ms` (or `max_batch` records) and
+    scores them together with score_fn(records) -> sequence of probabilities.
+    """
+
+    def __init__(self, score_fn, executor, window_ms=2.0, max_batch=64):
+        self.score_fn = score_fn
+        self.executor = executor
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, record):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((record, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        records = [record for record, _ in batch]
+        try:
+            results = await loop.run_in_executor(self.executor, self.score_fn, records)
+        except Exception:
+            # one bad record shouldn't fail its neighbours: retry one by one
+            results = await loop.run_in_executor(self.executor, self._score_each, records)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():   # caller went away
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _score_each(self, records):
+        results = []
+        for record in records:
+            try:
+                results.append(self.score_fn([record])[0])
+            except Exception as e:
+                results.append(e)
+        return results
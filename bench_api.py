@@ -0,0 +1,247 @@
+# bench_api.py
+#
+# Repeatable load test for the API. Starts `uvicorn main:app` locally, sends
+# StrokeInput payloads sampled from stroke_data.csv at each concurrency level
+# (closed loop: N client threads, each with its own keep-alive session) and
+# reports p50/p95/p99 latency, throughput and per-worker CPU / RSS.
+#
+#   python bench_api.py                          # compare with reports/bench/predict_w1.json
+#   python bench_api.py --concurrency 1,16 --workers 2
+#   python bench_api.py --update-baseline        # accept this run as the new baseline
+#
+# Every run is written to reports/bench/<name>.last.json. The first run for a
+# name (or --update-baseline) becomes reports/bench/<name>.json; later runs
+# exit with status 1 if p95 latency or throughput is worse than the baseline
+# by more than --tolerance. Baselines are machine-specific: compare runs from
+# the same box.
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import requests
+
+from dataset import read_dataset
+from measure_workers import smaps_rollup
+
+# ---------- CONFIG ----------
+DATA_PATH = "stroke_data.csv"
+BENCH_DIR = Path("reports") / "bench"
+PORT = 8799
+WORKERS = 1                     # uvicorn --workers
+CONCURRENCY = "1,8,32"          # client threads per level
+N_REQUESTS = 2000               # per concurrency level
+WARMUP_REQUESTS = 100
+TOLERANCE = 0.15                # allowed p95 / throughput regression vs baseline
+SEED = 0
+# Server environment: no request log, no hot reload, and no prediction cache
+# (sampled payloads rarely repeat, and cache hits would hide scoring cost)
+SERVER_ENV = {"REQUEST_LOG_PATH": "", "MODEL_POLL_SECONDS": "0", "CACHE_SIZE": "0"}
+# -----------------------------
+
+FIELDS = ["gender", "age", "hypertension", "heart_disease", "ever_married", "Residence_type",
+          "avg_glucose_level", "bmi", "smoking_status", "work_type"]
+
+
+def sample_payloads(n, seed=SEED):
+    """n StrokeInput dicts. Whole rows are drawn from the data so the fields
+    stay jointly realistic (no smoking toddlers), missing BMI is filled from
+    the observed BMIs, and glucose/BMI get a little noise so payloads differ."""
+    rng = np.random.default_rng(seed)
+    df = read_dataset(DATA_PATH)[FIELDS]
+    rows = df.iloc[rng.integers(0, len(df), n)].reset_index(drop=True)
+
+    observed_bmi = df["bmi"].dropna().to_numpy()
+    missing = rows["bmi"].isna().to_numpy()
+    rows.loc[missing, "bmi"] = rng.choice(observed_bmi, missing.sum())
+    rows["bmi"] = (rows["bmi"] + rng.normal(0, 0.5, n)).clip(10, 90).round(1)
+    rows["avg_glucose_level"] = (rows["avg_glucose_level"] + rng.normal(0, 2.0, n)).clip(40, 400).round(2)
+    return rows.to_dict("records")
+
+
+# ---------- server ----------
+def start_server(workers, port):
+    env = dict(os.environ, **SERVER_ENV)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"❌ Server exited with code {proc.returncode}")
+        try:
+            if requests.get(url + "/", timeout=1).ok and len(worker_pids(proc.pid, workers)) == workers:
+                return proc, url
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise SystemExit("❌ Server didn't come up within 120s")
+
+
+def worker_pids(pid, workers):
+    # --workers 1 serves from the uvicorn process itself; otherwise its
+    # spawned children (skipping multiprocessing's resource tracker)
+    if workers == 1:
+        return [pid]
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        children = [int(c) for c in f.read().split()]
+    pids = []
+    for child in children:
+        with open(f"/proc/{child}/cmdline", "rb") as f:
+            if b"spawn_main" in f.read():
+                pids.append(child)
+    return pids
+
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")   # utime + stime
+
+
+# ---------- load ----------
+def run_level(url, path, payloads, concurrency, pids):
+    local = threading.local()
+
+    def send(payload):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        response = session.post(url + path, json=payload, timeout=30)
+        elapsed = time.perf_counter() - start
+        return elapsed, response.status_code != 200 or "error" in response.json()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, payloads[:WARMUP_REQUESTS]))
+
+        cpu_before = [cpu_seconds(p) for p in pids]
+        start = time.perf_counter()
+        latencies, failed = np.array(list(pool.map(send, payloads[WARMUP_REQUESTS:]))).T
+        wall = time.perf_counter() - start
+        cpu_after = [cpu_seconds(p) for p in pids]
+
+    p50, p95, p99 = np.percentile(latencies * 1000, [50, 95, 99])
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": int(failed.sum()),
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "mean_ms": latencies.mean() * 1000,
+        "throughput_rps": len(latencies) / wall,
+        "workers": [
+            {"pid": p, "cpu_percent": 100 * (after - before) / wall, "rss_mb": smaps_rollup(p)["rss"]}
+            for p, before, after in zip(pids, cpu_before, cpu_after)
+        ],
+    }
+
+
+# ---------- baselines ----------
+def compare(result, baseline, tolerance):
+    """List of regressions of result vs baseline (empty = pass)."""
+    failures = []
+    base_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    for level in result["levels"]:
+        base = base_levels.get(level["concurrency"])
+        if base is None:
+            continue
+        c = level["concurrency"]
+        if level["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            failures.append(f"c={c}: p95 {level['p95_ms']:.2f} ms vs baseline {base['p95_ms']:.2f} ms")
+        if level["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            failures.append(f"c={c}: throughput {level['throughput_rps']:.0f} req/s "
+                            f"vs baseline {base['throughput_rps']:.0f} req/s")
+        if level["errors"] > base["errors"]:
+            failures.append(f"c={c}: {level['errors']} errors vs baseline {base['errors']}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /predict against a local uvicorn")
+    parser.add_argument("--concurrency", default=CONCURRENCY, help="comma-separated client thread counts")
+    parser.add_argument("--requests", type=int, default=N_REQUESTS, help="per concurrency level")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="uvicorn --workers")
+    parser.add_argument("--path", default="/predict", help="endpoint to POST to, e.g. /explain")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--name", default=None, help="baseline name (default: <endpoint>_w<workers>)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        raise SystemExit("❌ Needs Linux /proc for the per-worker CPU / RSS numbers")
+    name = args.name or f"{args.path.strip('/').replace('/', '_')}_w{args.workers}"
+    levels = [int(c) for c in args.concurrency.split(",")]
+    payloads = sample_payloads(WARMUP_REQUESTS + args.requests)
+
+    proc, url = start_server(args.workers, args.port)
+    try:
+        pids = worker_pids(proc.pid, args.workers)
+        model = requests.get(url + "/model", timeout=5).json()
+        print(f"{url}{args.path}: {args.workers} worker(s), backend={model.get('backend')}, "
+              f"model {model.get('model_version')}, {args.requests} requests per level\n")
+        print(f"{'conc':>5s}{'req/s':>9s}{'p50 ms':>9s}{'p95 ms':>9s}{'p99 ms':>9s}{'errors':>8s}"
+              f"{'CPU % / worker':>16s}{'RSS MB / worker':>17s}")
+        results = []
+        for c in levels:
+            r = run_level(url, args.path, payloads, c, pids)
+            results.append(r)
+            cpu = "/".join(f"{w['cpu_percent']:.0f}" for w in r["workers"])
+            rss = "/".join(f"{w['rss_mb']:.0f}" for w in r["workers"])
+            print(f"{c:>5d}{r['throughput_rps']:>9.0f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+                  f"{r['p99_ms']:>9.2f}{r['errors']:>8d}{cpu:>16s}{rss:>17s}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    result = {
+        "name": name,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "path": args.path,
+        "server_workers": args.workers,
+        "server_env": SERVER_ENV,
+        "model_version": model.get("model_version"),
+        "backend": model.get("backend"),
+        "host": {"python": platform.python_version(), "cpus": os.cpu_count(), "machine": platform.machine()},
+        "levels": results,
+    }
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    with open(BENCH_DIR / f"{name}.last.json", "w") as f:
+        json.dump(result, f, indent=2)
+
+    baseline_path = BENCH_DIR / f"{name}.json"
+    if args.update_baseline or not baseline_path.exists():
+        with open(baseline_path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\n💾 Saved baseline {baseline_path}")
+        return
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline.get("host") != result["host"]:
+        print(f"⚠️ Baseline was recorded on a different host: {baseline.get('host')}")
+    failures = compare(result, baseline, args.tolerance)
+    if failures:
+        print(f"\n❌ Regression vs {baseline_path} (tolerance {args.tolerance:.0%}):")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print(f"\n✅ Within {args.tolerance:.0%} of {baseline_path} ({baseline['created']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# bench_explain.py
+#
+# Latency cost of explanations: /predict vs /predict?explain=true vs /explain
+# (in-process through FastAPI's TestClient, prediction cache off), plus the
+# bare Explainer.explain call. Records are drawn from stroke_data.csv.
+#
+#   python bench_explain.py
+#   python bench_explain.py --requests 2000
+
+import argparse
+import os
+import time
+
+# before importing main: measure scoring, not cache hits or log writes
+os.environ.setdefault("CACHE_SIZE", "0")
+os.environ.setdefault("REQUEST_LOG_PATH", "")
+os.environ.setdefault("MODEL_POLL_SECONDS", "0")
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import main
+from fast_features import records_to_columns
+
+# ---------- CONFIG ----------
+DATA_PATH = "stroke_data.csv"
+N_REQUESTS = 500
+# -----------------------------
+
+
+def percentiles(times_ms):
+    return np.percentile(times_ms, [50, 95, 99])
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Explanation latency benchmark")
+    parser.add_argument("--requests", type=int, default=N_REQUESTS)
+    args = parser.parse_args()
+
+    active = main.registry.current
+    if active.explainer is None:
+        raise SystemExit(f"❌ No explainer for the {active.backend} backend (needs the full pipeline)")
+
+    df = pd.read_csv(DATA_PATH).drop(columns=["id", "stroke"], errors="ignore")
+    df = df.dropna()
+    records = df.sample(args.requests, replace=True, random_state=0).to_dict("records")
+
+    client = TestClient(main.app)
+    cases = {
+        "POST /predict": lambda r: client.post("/predict", json=r),
+        "POST /predict?explain=true": lambda r: client.post("/predict", params={"explain": "true"}, json=r),
+        "POST /explain": lambda r: client.post("/explain", json=r),
+    }
+    print(f"{args.requests} requests each, backend={active.backend}\n")
+    print(f"{'':30s}{'p50 ms':>9s}{'p95 ms':>9s}{'p99 ms':>9s}")
+    for name, call in cases.items():
+        for r in records[:20]:   # warm up
+            call(r)
+        times = []
+        for r in records:
+            start = time.perf_counter()
+            response = call(r)
+            times.append((time.perf_counter() - start) * 1000)
+        if "error" in response.json():
+            raise SystemExit(f"❌ {name}: {response.json()['error']}")
+        print(f"{name:30s}" + "".join(f"{t:>9.2f}" for t in percentiles(times)))
+
+    times = []
+    for r in records:
+        cols = records_to_columns([r])
+        start = time.perf_counter()
+        active.explainer.explain(cols)
+        times.append((time.perf_counter() - start) * 1000)
+    print(f"{'Explainer.explain (1 row)':30s}" + "".join(f"{t:>9.2f}" for t in percentiles(times)))
+
+
+if __name__ == "__main__":
+    main_bench()
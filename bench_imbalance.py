@@ -0,0 +1,117 @@
+# bench_imbalance.py
+#
+# The class-imbalance strategies from imbalance.py side by side: the
+# resampling and XGBoost fit time, peak memory and hold-out PR-AUC, with the
+# current SMOTE setup as the reference. Each strategy runs in a fresh process
+# on the same stratified train/test split; FeatureEngineer + ColumnTransformer
+# are fitted too but not compared (they're the same for every strategy).
+#
+#   python bench_imbalance.py                        # stroke_data.csv
+#   python bench_imbalance.py --rows 1000000         # synthetic data (synthetic_data.py)
+#   python bench_imbalance.py --strategies smote,weights
+#
+# On synthetic data PR-AUC is optimistic (test rows are noisy copies of real
+# rows that also feed the training set); compare strategies, not absolute values.
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from bench_training import StageProfiler
+from imbalance import STRATEGIES
+
+# ---------- CONFIG ----------
+DATA_PATH = "stroke_data.csv"
+BENCH_DIR = Path("reports") / "bench"
+# -----------------------------
+
+
+def child(path, strategy):
+    from sklearn.metrics import average_precision_score
+    from sklearn.model_selection import train_test_split
+
+    from train_pipeline import build_pipeline
+    from training_common import RANDOM_STATE, TEST_SIZE, load_data
+
+    X, y = load_data(path)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, stratify=y, test_size=TEST_SIZE, random_state=RANDOM_STATE
+    )
+    pipe = build_pipeline(X_train, imbalance=strategy, y_train=y_train)
+    (_, fe), (_, pre), *sampler, (_, model) = pipe.steps
+
+    profiler = StageProfiler()
+    Xt = profiler.run("preprocessing", lambda: pre.fit_transform(fe.fit_transform(X_train)))
+    yt = y_train
+    if sampler:
+        Xt, yt = profiler.run("resample", sampler[0][1].fit_resample, Xt, yt)
+    else:
+        profiler.results["resample"] = {"seconds": 0.0, "peak_mb": 0.0}
+    profiler.run("model", model.fit, Xt, yt)
+
+    print(json.dumps({
+        "strategy": strategy,
+        "train_rows": len(y_train),
+        "fit_rows": len(yt),
+        "stages": profiler.results,
+        "fit_seconds": profiler.results["resample"]["seconds"] + profiler.results["model"]["seconds"],
+        "peak_mb": max(profiler.results["resample"]["peak_mb"], profiler.results["model"]["peak_mb"]),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "pr_auc": average_precision_score(y_test, pipe.predict_proba(X_test)[:, 1]),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit time, memory and PR-AUC of the imbalance strategies")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--rows", type=int, default=None, help="use a synthetic dataset of this size instead")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES))
+    parser.add_argument("--child", nargs=2, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(*args.child)
+
+    path = args.data
+    if args.rows:
+        from synthetic_data import generate, output_path
+
+        path = output_path(args.rows)
+        if not os.path.exists(path):
+            print(f"Generating {args.rows:,} rows -> {path}")
+            generate(args.rows, path)
+
+    results = []
+    for strategy in args.strategies.split(","):
+        print(f"{strategy}...", file=sys.stderr, flush=True)
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", path, strategy],
+                             stdout=subprocess.PIPE, text=True)
+        if out.returncode != 0:
+            raise SystemExit(f"❌ {strategy} failed (exit code {out.returncode})")
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    ref = next((r for r in results if r["strategy"] == "smote"), results[0])
+    print(f"\n{path}: {ref['train_rows']:,} training rows, reference = {ref['strategy']}\n")
+    print(f"{'strategy':14s}{'fit rows':>11s}{'resample s':>12s}{'model s':>9s}{'fit s':>8s}{'speedup':>9s}"
+          f"{'peak MB':>9s}{'max RSS MB':>12s}{'PR-AUC':>8s}{'vs ref':>8s}")
+    for r in results:
+        print(f"{r['strategy']:14s}{r['fit_rows']:>11,d}{r['stages']['resample']['seconds']:>12.2f}"
+              f"{r['stages']['model']['seconds']:>9.2f}{r['fit_seconds']:>8.2f}"
+              f"{ref['fit_seconds'] / r['fit_seconds']:>8.1f}x{r['peak_mb']:>9.0f}{r['max_rss_mb']:>12.0f}"
+              f"{r['pr_auc']:>8.4f}{r['pr_auc'] - ref['pr_auc']:>+8.4f}")
+    print("\nfit s = resample + XGBoost fit; peak MB = largest RSS increase during either.")
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    with open(BENCH_DIR / "imbalance.json", "w") as f:
+        json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "data": path, "cpus": os.cpu_count(),
+                   "results": results}, f, indent=2)
+    print(f"💾 Saved {BENCH_DIR / 'imbalance.json'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# bench_training.py
+#
+# How train_pipeline.py scales with the number of rows. For each size a
+# synthetic dataset is generated (synthetic_data.py, reused if already on
+# disk) and the pipeline's stages are run one by one in a fresh process:
+#
+#   load -> feature_engineering -> preprocessing (ColumnTransformer) -> resample (SMOTE) -> model (XGBClassifier.fit)
+#
+# Each stage reports wall time and peak memory: the highest RSS seen while it
+# ran (sampled every 10 ms, so native allocations in XGBoost/SMOTE count too)
+# minus the RSS when it started. The summary shows each stage's share of the
+# time, how it grows (time ~ rows^k between consecutive sizes) and which stage
+# is the bottleneck at each size. Results go to reports/bench/training_scale.json.
+#
+#   python bench_training.py                                # 10k, 100k, 1M
+#   python bench_training.py --rows 10000,100000,1000000,10000000
+
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+# ---------- CONFIG ----------
+ROWS = "10000,100000,1000000"
+BENCH_DIR = Path("reports") / "bench"
+SAMPLE_SECONDS = 0.01
+# -----------------------------
+
+STAGES = ["load", "feature_engineering", "preprocessing", "resample", "model"]
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+class StageProfiler:
+    """Wall time + peak RSS increase per stage."""
+
+    def __init__(self):
+        self.results = {}
+        self._peak = 0.0
+        self._running = False
+
+    def _sample(self):
+        while self._running:
+            self._peak = max(self._peak, rss_mb())
+            time.sleep(SAMPLE_SECONDS)
+
+    def run(self, name, fn, *args):
+        start_rss = self._peak = rss_mb()
+        self._running = True
+        sampler = threading.Thread(target=self._sample, daemon=True)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            seconds = time.perf_counter() - start
+            self._running = False
+            sampler.join()
+            self._peak = max(self._peak, rss_mb())
+            self.results[name] = {"seconds": seconds, "peak_mb": self._peak - start_rss}
+            print(f"   {name:20s}{seconds:9.2f}s{self._peak - start_rss:10.0f} MB", file=sys.stderr, flush=True)
+
+
+def child(path, imbalance):
+    # one dataset size, in its own process so memory numbers don't carry over
+    from train_pipeline import build_pipeline
+    from training_common import load_data
+
+    profiler = StageProfiler()
+    X, y = profiler.run("load", load_data, path)
+    pipe = build_pipeline(X, imbalance=imbalance, y_train=y)
+    (_, fe), (_, pre), *sampler, (_, model) = pipe.steps
+    X = profiler.run("feature_engineering", fe.fit_transform, X)
+    X = profiler.run("preprocessing", pre.fit_transform, X)
+    if sampler:
+        X, y = profiler.run("resample", sampler[0][1].fit_resample, X, y)
+    else:
+        profiler.results["resample"] = {"seconds": 0.0, "peak_mb": 0.0}
+    profiler.run("model", model.fit, X, y)
+    print(json.dumps({"rows_after_smote": len(y), "stages": profiler.results}))
+
+
+def run_size(n_rows, convert, imbalance):
+    from dataset import convert_csv, is_current, store_path
+    from synthetic_data import generate, output_path
+
+    path = output_path(n_rows)
+    if not os.path.exists(path):
+        print(f"Generating {n_rows:,} rows -> {path}", file=sys.stderr)
+        generate(n_rows, path)
+    if convert and not is_current(store_path(path), path):
+        convert_csv(path)
+
+    print(f"{n_rows:,} rows:", file=sys.stderr, flush=True)
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", path, "--imbalance", imbalance],
+                         stdout=subprocess.PIPE, text=True)
+    if out.returncode != 0:
+        raise SystemExit(f"❌ {n_rows:,} rows failed (exit code {out.returncode})")
+    return dict(rows=n_rows, **json.loads(out.stdout.strip().splitlines()[-1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage time and memory of train_pipeline.py vs data size")
+    parser.add_argument("--rows", default=ROWS, help="comma-separated dataset sizes")
+    parser.add_argument("--csv", action="store_true", help="load from CSV instead of the columnar copy")
+    parser.add_argument("--imbalance", default="smote", help="resampling strategy (see imbalance.py)")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.imbalance)
+    if not os.path.exists("/proc/self/statm"):
+        raise SystemExit("❌ Needs Linux /proc for the memory numbers")
+
+    results = [run_size(int(n), not args.csv, args.imbalance) for n in args.rows.split(",")]
+
+    print(f"\n{'rows':>11s}  " + "".join(f"{s:>22s}" for s in STAGES) + f"{'total s':>10s}  bottleneck (time / memory)")
+    for r in results:
+        total = sum(r["stages"][s]["seconds"] for s in STAGES)
+        cells = "".join(
+            f"{r['stages'][s]['seconds']:>8.2f}s {r['stages'][s]['seconds'] / total:>4.0%} "
+            f"{r['stages'][s]['peak_mb']:>6.0f}MB" for s in STAGES
+        )
+        r["total_seconds"] = total
+        r["bottleneck"] = max(STAGES, key=lambda s: r["stages"][s]["seconds"])
+        r["memory_bottleneck"] = max(STAGES, key=lambda s: r["stages"][s]["peak_mb"])
+        print(f"{r['rows']:>11,d}  {cells}{total:>10.2f}  {r['bottleneck']} / {r['memory_bottleneck']}")
+
+    # time ~ rows^k: k ~ 1 is linear, > 1 grows faster than the data
+    if len(results) > 1:
+        print(f"\n{'scaling exponent k':>20s}  " + "".join(f"{s:>22s}" for s in STAGES))
+        for a, b in zip(results, results[1:]):
+            ratio = math.log(b["rows"] / a["rows"])
+            ks = {s: math.log(max(b["stages"][s]["seconds"], 1e-6) / max(a["stages"][s]["seconds"], 1e-6)) / ratio
+                  for s in STAGES}
+            b["scaling_exponent"] = ks
+            label = f"{a['rows']:,} -> {b['rows']:,}"
+            print(f"{label:>20s}  " + "".join(f"{ks[s]:>22.2f}" for s in STAGES))
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    with open(BENCH_DIR / "training_scale.json", "w") as f:
+        json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "cpus": os.cpu_count(),
+                   "imbalance": args.imbalance, "results": results}, f, indent=2)
+    print(f"\n💾 Saved {BENCH_DIR / 'training_scale.json'}")
+
+
+if __name__ == "__main__":
+    main()
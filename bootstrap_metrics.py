@@ -0,0 +1,100 @@
+# bootstrap_metrics.py
+#
+# Bootstrap confidence intervals for metrics_report.py. Each chunk of
+# resamples is one (B, n) index matrix turned into per-row counts, and the
+# metrics of all B resamples come out of a few array ops:
+#
+#   - precision / recall / F1 at the threshold: weighted sums of TP/FP/FN
+#   - average precision: scores are sorted once for the whole run; weighted
+#     cumulative TP/total counts at every distinct score give every
+#     resample's precision-recall steps at once (same definition as
+#     sklearn's average_precision_score)
+#
+# Chunks are sized from a memory budget (CHUNK_BYTES per (chunk, n) float64
+# matrix; a task holds a handful of them), so large datasets get fewer
+# resamples per task instead of more memory. Chunks are seeded by their index,
+# so results don't depend on the number of worker processes.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# ---------- CONFIG ----------
+N_RESAMPLES = 2000
+CHUNK_BYTES = 32_000_000        # per (resamples x rows) float64 matrix in a task
+CONFIDENCE = 0.95
+SEED = 42
+# -----------------------------
+
+METRICS = ["pr_auc", "f1", "precision", "recall"]
+
+_state = None   # per-worker (y, y_pred, order, y_sorted, group_ends), set by _init_worker
+
+
+def _init_worker(y, y_proba, y_pred):
+    global _state
+    y = np.asarray(y, dtype=bool)
+    order = np.argsort(-np.asarray(y_proba), kind="mergesort")
+    scores = np.asarray(y_proba)[order]
+    # last position of each run of tied scores
+    group_ends = np.r_[np.flatnonzero(np.diff(scores)), len(scores) - 1]
+    _state = (y, np.asarray(y_pred, dtype=bool), order, y[order], group_ends)
+
+
+def chunk_size(n, chunk_bytes=CHUNK_BYTES):
+    # resamples per task for n rows
+    return max(1, chunk_bytes // (n * 8))
+
+
+def resample_counts(rng, n, b):
+    # (b, n) matrix: how often each row was drawn in each resample
+    idx = rng.integers(0, n, size=(b, n))
+    offsets = (np.arange(b) * n)[:, None]
+    return np.bincount((idx + offsets).ravel(), minlength=b * n).reshape(b, n)
+
+
+def _chunk_metrics(chunk, size):
+    y, y_pred, order, y_sorted, group_ends = _state
+    rng = np.random.default_rng([SEED, chunk])
+    w = resample_counts(rng, len(y), size).astype(np.float64)
+
+    # thresholded metrics
+    tp = w @ (y & y_pred)
+    fp = w @ (~y & y_pred)
+    fn = w @ (y & ~y_pred)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+
+        # average precision = sum over distinct scores of delta recall x precision
+        ws = w[:, order]
+        tp_cum = np.cumsum(ws * y_sorted, axis=1)[:, group_ends]
+        all_cum = np.cumsum(ws, axis=1)[:, group_ends]
+        n_pos = tp_cum[:, -1:]
+        step_precision = np.where(all_cum > 0, tp_cum / all_cum, 0.0)
+        delta_recall = np.diff(tp_cum, axis=1, prepend=0.0) / n_pos
+        pr_auc = (delta_recall * step_precision).sum(axis=1)
+
+    return np.column_stack([pr_auc, f1, precision, recall])
+
+
+def bootstrap(y, y_proba, y_pred, n_resamples=N_RESAMPLES, workers=None, chunk=None):
+    """Returns a (n_resamples, len(METRICS)) array of resampled metrics.
+    Resamples without positives come out as NaN (AP) and are ignored by ci()."""
+    chunk = chunk or chunk_size(len(y))
+    sizes = [min(chunk, n_resamples - start) for start in range(0, n_resamples, chunk)]
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        _init_worker(y, y_proba, y_pred)
+        return np.vstack([_chunk_metrics(i, size) for i, size in enumerate(sizes)])
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(y, y_proba, y_pred)) as pool:
+        return np.vstack(list(pool.map(_chunk_metrics, range(len(sizes)), sizes)))
+
+
+def ci(samples, confidence=CONFIDENCE):
+    alpha = (1 - confidence) / 2
+    low, high = np.nanquantile(samples, [alpha, 1 - alpha], axis=0)
+    return dict(zip(METRICS, zip(low, high)))
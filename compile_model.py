@@ -0,0 +1,332 @@
+# compile_model.py
+#
+# Folds the fitted pipeline (FeatureEngineer -> ColumnTransformer -> XGBClassifier)
+# into plain arrays: imputer medians/modes, scaler mean/scale, one-hot
+# vocabularies and every boosted tree as flat node arrays. The result is a
+# small .npz that scores rows with NumPy only (no pandas / sklearn / xgboost).
+#
+#   python compile_model.py            # export xgb_kernel.npz
+#   python compile_model.py --export-dir xgb_kernel   # + one .npy per array, for mmap
+#   python compile_model.py --check    # + parity vs model.predict_proba on stroke_data.csv
+#   python compile_model.py --bench    # + latency comparison
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+
+from fast_features import FastFeatures
+
+# ---------- CONFIG ----------
+MODEL_PATH = "xgb_pipe.joblib"      # trained pipeline to compile
+META_PATH = "model_meta.json"       # glucose quartiles for pipelines saved before FeatureEngineer
+KERNEL_PATH = "xgb_kernel.npz"      # compiled artifact
+EXPORT_DIR = "xgb_kernel"           # memory-mappable export (--export-dir)
+DATA_PATH = "stroke_data.csv"       # used for the parity check / benchmark
+PARITY_TOL = 1e-6                   # max abs difference in probability
+PREDICT_CHUNK = 65536               # rows per chunk when scoring large inputs
+# -----------------------------
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class TreeKernel:
+    """All boosted trees as flat node arrays, evaluated one level at a time.
+
+    Nodes are renumbered so the right child always sits at left + 1, and
+    leaves point to themselves with a NaN threshold. After `depth` steps
+    every row sits on a leaf of every tree and the margin is a gather + sum.
+    """
+
+    def __init__(self, feature, threshold, left, default_left, value,
+                 roots, depth, base_margin):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float32)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.depth = int(depth)
+        self.base_margin = float(base_margin)
+
+    @classmethod
+    def from_booster(cls, booster):
+        model = json.loads(bytes(booster.save_raw("json")))
+        learner = model["learner"]
+        if learner["objective"]["name"] != "binary:logistic":
+            raise ValueError("Only binary:logistic boosters can be compiled")
+
+        base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+        trees = learner["gradient_booster"]["model"]["trees"]
+        best_iteration = booster.attr("best_iteration")
+        if best_iteration is not None:
+            trees = trees[: int(best_iteration) + 1]
+
+        feature, threshold, left, default_left, value, roots = [], [], [], [], [], []
+        depth = 0
+        for tree in trees:
+            if any(tree["split_type"]):
+                raise ValueError("Categorical splits are not supported")
+            lc, rc = tree["left_children"], tree["right_children"]
+
+            # breadth-first renumbering: a node's id is root + its queue
+            # position, so the two children of a split get consecutive ids
+            root = len(feature)
+            roots.append(root)
+            queue = [(0, 0)]   # (xgboost node id, level)
+            for pos, (node, level) in enumerate(queue):
+                if lc[node] == -1:
+                    feature.append(0)
+                    threshold.append(np.nan)
+                    left.append(root + pos)
+                    default_left.append(True)
+                    # leaf weights are stored in split_conditions for leaf nodes
+                    value.append(tree["split_conditions"][node])
+                    depth = max(depth, level)
+                else:
+                    feature.append(tree["split_indices"][node])
+                    threshold.append(tree["split_conditions"][node])
+                    left.append(root + len(queue))
+                    default_left.append(bool(tree["default_left"][node]))
+                    value.append(0.0)
+                    queue.append((lc[node], level + 1))
+                    queue.append((rc[node], level + 1))
+
+        return cls(
+            feature=feature,
+            threshold=threshold,
+            left=left,
+            default_left=default_left,
+            value=value,
+            roots=roots,
+            depth=depth,
+            base_margin=np.log(base_score / (1 - base_score)),
+        )
+
+    def margin(self, X):
+        # XGBoost compares float32 features against float32 split conditions
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        flat = X.ravel()
+        has_missing = np.isnan(flat).any()
+        row_offsets = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        node = np.repeat(self.roots[None, :], X.shape[0], axis=0)
+        for _ in range(self.depth):
+            x = flat[row_offsets + self.feature[node]]
+            # x >= NaN is False, so leaves stay put
+            go_right = x >= self.threshold[node]
+            if has_missing:
+                missing = np.isnan(x)
+                go_right[missing] = ~self.default_left[node[missing]]
+            node = self.left[node] + go_right
+        return self.base_margin + self.value[node].sum(axis=1, dtype=np.float64)
+
+    def predict(self, X):
+        # probability of the positive class
+        out = np.empty(X.shape[0])
+        for start in range(0, X.shape[0], PREDICT_CHUNK):
+            stop = start + PREDICT_CHUNK
+            out[start:stop] = 1.0 / (1.0 + np.exp(-self.margin(X[start:stop])))
+        return out
+
+    def to_arrays(self):
+        return {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "left": self.left,
+            "default_left": self.default_left,
+            "value": self.value,
+            "roots": self.roots,
+            "depth": np.asarray(self.depth),
+            "base_margin": np.asarray(self.base_margin),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(**{name: arrays[name] for name in (
+            "feature", "threshold", "left", "default_left",
+            "value", "roots", "depth", "base_margin",
+        )})
+
+
+class CompiledModel:
+    """FastFeatures + TreeKernel: raw input columns -> probabilities."""
+
+    def __init__(self, features, trees, source_hash=""):
+        self.features = features
+        self.trees = trees
+        self.source_hash = source_hash
+
+    @classmethod
+    def from_pipeline(cls, pipe, source_hash=""):
+        booster = pipe.steps[-1][1].get_booster()
+        return cls(FastFeatures.from_pipeline(pipe), TreeKernel.from_booster(booster), source_hash)
+
+    def predict_proba(self, cols):
+        p = self.trees.predict(self.features.transform(cols))
+        return np.column_stack([1 - p, p])
+
+    def to_arrays(self):
+        arrays = {f"features__{k}": v for k, v in self.features.to_arrays().items()}
+        arrays.update({f"trees__{k}": v for k, v in self.trees.to_arrays().items()})
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, source_hash=""):
+        split = lambda prefix: {
+            k[len(prefix):]: v for k, v in arrays.items() if k.startswith(prefix)
+        }
+        return cls(
+            FastFeatures.from_arrays(split("features__")),
+            TreeKernel.from_arrays(split("trees__")),
+            source_hash,
+        )
+
+    def save(self, path):
+        arrays = self.to_arrays()
+        arrays["source_hash"] = np.asarray(self.source_hash)
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {k: data[k] for k in data.files}
+        return cls.from_arrays(arrays, str(arrays.pop("source_hash")))
+
+    # ---------- memory-mappable export ----------
+    # One uncompressed .npy per array plus manifest.json. load_dir() maps the
+    # files read-only, so N uvicorn workers share the same page-cache pages
+    # instead of each holding a private copy of the trees.
+    def save_dir(self, path):
+        # build next to the target, then swap directories; workers that have
+        # the old files mapped keep reading them until they reload
+        tmp = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        arrays, scalars = {}, {}
+        for name, value in self.to_arrays().items():
+            if np.ndim(value) == 0:
+                scalars[name] = value.item()    # depth, base_margin
+            else:
+                arrays[name] = value
+                np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(value))
+        with open(os.path.join(tmp, "manifest.json"), "w") as f:
+            json.dump({"source_hash": self.source_hash, "scalars": scalars, "arrays": sorted(arrays)}, f, indent=2)
+
+        old = f"{path}.old-{os.getpid()}"
+        if os.path.exists(path):
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load_dir(cls, path, mmap_mode="r"):
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+            for name in manifest["arrays"]
+        }
+        arrays.update(manifest["scalars"])
+        return cls.from_arrays(arrays, manifest["source_hash"])
+
+
+def load_if_current(kernel_path=KERNEL_PATH, model_path=MODEL_PATH):
+    # Only trust a kernel compiled from the pipeline that is deployed now
+    try:
+        kernel = CompiledModel.load(kernel_path)
+    except FileNotFoundError:
+        return None
+    if kernel.source_hash != file_sha256(model_path):
+        print(f"⚠️ {kernel_path} was compiled from a different {model_path}; ignoring it")
+        return None
+    return kernel
+
+
+def _median_us(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1e6
+
+
+def main():
+    import pandas as pd
+
+    from preprocessing import load_pipeline
+
+    parser = argparse.ArgumentParser(description="Compile xgb_pipe.joblib into a flat NumPy kernel")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--meta", default=META_PATH)
+    parser.add_argument("--out", default=KERNEL_PATH)
+    parser.add_argument("--export-dir", nargs="?", const=EXPORT_DIR, default=None,
+                        help=f"also write a memory-mappable export (default {EXPORT_DIR}/)")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--check", action="store_true", help="parity check against model.predict_proba")
+    parser.add_argument("--bench", action="store_true", help="latency comparison")
+    parser.add_argument("--repeats", type=int, default=500)
+    args = parser.parse_args()
+
+    print("Loading model...")
+    pipe = load_pipeline(args.model, args.meta)
+    compiled = CompiledModel.from_pipeline(pipe, source_hash=file_sha256(args.model))
+    compiled.save(args.out)
+    compiled = CompiledModel.load(args.out)
+    n_nodes = len(compiled.trees.feature)
+    print(f"Saved {args.out}: {len(compiled.trees.roots)} trees, {n_nodes} nodes, depth {compiled.trees.depth}")
+    if args.export_dir:
+        compiled.save_dir(args.export_dir)
+        print(f"Saved {args.export_dir}/ (serve it with MODEL_EXPORT_DIR={args.export_dir})")
+
+    if not (args.check or args.bench):
+        return
+
+    df = pd.read_csv(args.data)
+    X = df.drop(columns=[c for c in ("stroke", "id") if c in df.columns])
+
+    if args.check:
+        print("Checking parity against model.predict_proba...")
+        expected = pipe.predict_proba(X)[:, 1]
+        got = compiled.predict_proba(X)[:, 1]
+        max_diff = float(np.abs(expected - got).max())
+        print(f"Max abs difference over {len(X)} rows: {max_diff:.2e}")
+        if max_diff > PARITY_TOL:
+            raise SystemExit(f"❌ Parity check failed (tolerance {PARITY_TOL})")
+        print("✅ Parity check passed")
+
+    if args.bench:
+        print("Benchmarking...")
+        row_df = X.iloc[[0]]
+        row_cols = {name: row_df[name].to_numpy() for name in row_df.columns}
+        fast = FastFeatures.from_pipeline(pipe)
+        clf = pipe.steps[-1][1]
+        single = {
+            "pipeline (pandas)": lambda: pipe.predict_proba(row_df),
+            "fast features + xgboost": lambda: clf.predict_proba(fast.transform(row_cols)),
+            "compiled kernel": lambda: compiled.predict_proba(row_cols),
+        }
+        batch = {
+            "pipeline (pandas)": lambda: pipe.predict_proba(X),
+            "fast features + xgboost": lambda: clf.predict_proba(fast.transform(X)),
+            "compiled kernel": lambda: compiled.predict_proba(X),
+        }
+        print(f"\n{'':28s}{'1 row (median µs)':>20s}{f'{len(X)} rows (ms)':>18s}")
+        for name in single:
+            one = _median_us(single[name], args.repeats)
+            full = _median_us(batch[name], max(3, args.repeats // 100)) / 1000
+            print(f"{name:28s}{one:>20.1f}{full:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
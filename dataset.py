@@ -0,0 +1,222 @@
+# dataset.py
+#
+# Typed, columnar copy of stroke_data.csv: one .npy per column, with string
+# columns dictionary-encoded (int32 codes + a category list in manifest.json).
+# Converting parses the CSV once (in chunks, so it scales past memory);
+# loading memory-maps the columns, so reading a few columns of a large file
+# costs almost nothing and no dtypes are re-inferred.
+#
+#   python dataset.py stroke_data.csv          # -> stroke_data.cols/
+#   python dataset.py stroke_data.csv --bench  # + load time vs pd.read_csv
+#
+# Scripts call read_dataset("stroke_data.csv"): it uses stroke_data.cols/ when
+# that was converted from the current CSV, and falls back to pd.read_csv.
+# "N/A" and the other pandas NA markers become NaN either way.
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+# ---------- CONFIG ----------
+CHUNK_ROWS = 500_000            # CSV rows parsed per chunk while converting
+# -----------------------------
+
+# pandas 3 shares the arrays anyway (copy-on-write) and deprecates copy=
+_NO_COPY = {} if int(pd.__version__.split(".")[0]) >= 3 else {"copy": False}
+
+
+def store_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".cols"
+
+
+def _source_stat(csv_path):
+    st = os.stat(csv_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _widen(path, dtype, new_dtype, chunk_rows=CHUNK_ROWS):
+    # rewrite a raw column file already written as dtype in new_dtype
+    old = np.memmap(path, dtype=dtype, mode="r") if os.path.getsize(path) else np.empty(0, dtype)
+    with open(f"{path}.widen", "wb") as f:
+        for start in range(0, len(old), chunk_rows):
+            f.write(old[start:start + chunk_rows].astype(new_dtype).tobytes())
+    del old
+    os.replace(f"{path}.widen", path)
+
+
+def convert_csv(csv_path, out_dir=None, chunk_rows=CHUNK_ROWS):
+    out_dir = out_dir or store_path(csv_path)
+    tmp_dir = f"{out_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = None      # name -> {"kind", "dtype", "categories"}
+    lookups = {}        # categorical name -> {value: code}
+    files = {}
+    n_rows = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        if columns is None:
+            # dtypes come from the first chunk; numeric ones are widened below
+            columns = {}
+            for name, dtype in chunk.dtypes.items():
+                if not pd.api.types.is_numeric_dtype(dtype):
+                    columns[name] = {"kind": "categorical", "dtype": "int32", "categories": []}
+                    lookups[name] = {}
+                else:
+                    columns[name] = {"kind": "numeric", "dtype": str(dtype)}
+                files[name] = open(os.path.join(tmp_dir, f"{name}.bin"), "wb")
+
+        for name, info in columns.items():
+            values = chunk[name]
+            if info["kind"] == "categorical":
+                # dictionary-encode; categories keep first-seen order, NaN -> -1
+                lookup = lookups[name]
+                for value in values.dropna().unique():
+                    if value not in lookup:
+                        lookup[value] = len(lookup)
+                        info["categories"].append(value)
+                data = values.map(lookup).fillna(-1).to_numpy(dtype=np.int32)
+            else:
+                # a later chunk with NaN or fractional values in a column the
+                # first chunk typed int (or a wider int) would be truncated by
+                # the cast: widen what was written so far instead
+                dtype = np.result_type(info["dtype"], values.dtype)
+                if dtype != info["dtype"] and pd.api.types.is_numeric_dtype(values.dtype):
+                    files[name].close()
+                    raw = os.path.join(tmp_dir, f"{name}.bin")
+                    _widen(raw, info["dtype"], dtype)
+                    files[name] = open(raw, "ab")
+                    info["dtype"] = str(dtype)
+                data = values.to_numpy(dtype=info["dtype"])
+            files[name].write(data.tobytes())
+        n_rows += len(chunk)
+
+    # raw column files -> .npy (header needs the final row count)
+    for name, info in columns.items():
+        files[name].close()
+        raw = os.path.join(tmp_dir, f"{name}.bin")
+        out = np.lib.format.open_memmap(
+            os.path.join(tmp_dir, f"{name}.npy"), mode="w+", dtype=info["dtype"], shape=(n_rows,)
+        )
+        if n_rows:
+            out[:] = np.fromfile(raw, dtype=info["dtype"])
+        out.flush()
+        del out
+        os.remove(raw)
+
+    with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+        json.dump({"source": _source_stat(csv_path), "n_rows": n_rows, "columns": columns}, f, indent=2)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return out_dir
+
+
+def load_manifest(store_dir):
+    with open(os.path.join(store_dir, "manifest.json")) as f:
+        return json.load(f)
+
+
+def _decode(info, codes):
+    # int32 codes -> object array of strings, code -1 -> NaN
+    categories = np.array(info["categories"] + [np.nan], dtype=object)
+    return categories[codes]
+
+
+def load_columns(store_dir, columns=None, decode=True):
+    """{name: array} memory-mapped from the store. Categorical columns are
+    decoded to object arrays of strings (NaN for missing) unless decode=False,
+    which returns the int32 codes as-is."""
+    manifest = load_manifest(store_dir)
+    out = {}
+    for name in columns or list(manifest["columns"]):
+        info = manifest["columns"][name]
+        data = np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode="r")
+        if info["kind"] == "categorical" and decode:
+            data = _decode(info, data)
+        out[name] = data
+    return out
+
+
+def load_frame(store_dir, columns=None):
+    # one single-column frame per memory map, concatenated without copying:
+    # pd.DataFrame(dict) would stack same-dtype columns into one 2-D copy
+    frames = [pd.Series(data, name=name, copy=False).to_frame()
+              for name, data in load_columns(store_dir, columns).items()]
+    return pd.concat(frames, axis=1, **_NO_COPY)
+
+
+def is_current(store_dir, csv_path):
+    if not os.path.exists(os.path.join(store_dir, "manifest.json")):
+        return False
+    return load_manifest(store_dir)["source"] == _source_stat(csv_path)
+
+
+def read_dataset(csv_path, columns=None):
+    """Drop-in for pd.read_csv(csv_path) that prefers the columnar store."""
+    store_dir = store_path(csv_path)
+    if is_current(store_dir, csv_path):
+        return load_frame(store_dir, columns)
+    if os.path.exists(store_dir):
+        print(f"⚠️ {store_dir}/ is older than {csv_path}; reading the CSV "
+              f"(rerun: python dataset.py {csv_path})")
+    return pd.read_csv(csv_path, usecols=columns)
+
+
+def iter_dataset(csv_path, chunk_rows=CHUNK_ROWS, columns=None):
+    """read_dataset() in DataFrames of up to chunk_rows rows, so only one
+    chunk is in memory at a time: slices of the memory maps when the store
+    is current, pd.read_csv(chunksize=) otherwise."""
+    store_dir = store_path(csv_path)
+    if not is_current(store_dir, csv_path):
+        yield from pd.read_csv(csv_path, usecols=columns, chunksize=chunk_rows)
+        return
+    manifest = load_manifest(store_dir)
+    arrays = load_columns(store_dir, columns, decode=False)
+    for start in range(0, manifest["n_rows"], chunk_rows):
+        chunk = {}
+        for name, data in arrays.items():
+            info = manifest["columns"][name]
+            part = np.asarray(data[start:start + chunk_rows])
+            chunk[name] = _decode(info, part) if info["kind"] == "categorical" else part
+        yield pd.DataFrame(chunk, index=pd.RangeIndex(start, start + len(part)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a CSV into the memory-mapped columnar store")
+    parser.add_argument("csv", nargs="?", default="stroke_data.csv")
+    parser.add_argument("--out", default=None, help="default: <csv name>.cols/")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--bench", action="store_true", help="compare load time with pd.read_csv")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    out_dir = convert_csv(args.csv, args.out, args.chunk_rows)
+    manifest = load_manifest(out_dir)
+    print(f"✅ {args.csv} -> {out_dir}/ ({manifest['n_rows']} rows, "
+          f"{len(manifest['columns'])} columns) in {time.perf_counter() - start:.2f}s")
+
+    if args.bench:
+        def best_of(fn, repeats=5):
+            times = []
+            for _ in range(repeats):
+                t = time.perf_counter()
+                fn()
+                times.append(time.perf_counter() - t)
+            return min(times) * 1000
+
+        csv_ms = best_of(lambda: pd.read_csv(args.csv))
+        frame_ms = best_of(lambda: load_frame(out_dir))
+        cols_ms = best_of(lambda: load_columns(out_dir, ["age", "bmi"]))
+        print(f"pd.read_csv:                 {csv_ms:9.2f} ms")
+        print(f"load_frame (all columns):    {frame_ms:9.2f} ms")
+        print(f"load_columns(['age','bmi']): {cols_ms:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
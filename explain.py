@@ -0,0 +1,71 @@
+# explain.py
+#
+# Per-request explanations: exact TreeSHAP contributions from XGBoost
+# (Booster.predict(pred_contribs=True)) on the model matrix, summed back onto
+# the StrokeInput fields. One-hot columns go to the field they encode;
+# engineered features built from several fields (e.g. age_bmi_interaction)
+# are split evenly between them. Contributions are in log-odds and, with
+# base_value, add up to the model's margin (before the overrides).
+#
+# Built once per loaded model by the registry; explaining one row costs a
+# FastFeatures transform + one pred_contribs call.
+
+import numpy as np
+
+from fast_features import RAW_COLUMNS
+
+
+class Explainer:
+    """booster + FastFeatures -> top raw-field contributions per row."""
+
+    def __init__(self, booster, fast_features, best_iteration=None):
+        import xgboost as xgb
+
+        self._xgb = xgb
+        self.booster = booster
+        self.fast_features = fast_features
+        self.iteration_range = (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+
+        # (n_model_features, n_raw_fields) attribution matrix
+        self.fields = list(RAW_COLUMNS)
+        self.attribution = np.zeros((fast_features.n_features, len(self.fields)))
+        for i, sources in enumerate(fast_features.feature_sources()):
+            for field in sources:
+                self.attribution[i, self.fields.index(field)] += 1.0 / len(sources)
+
+    @classmethod
+    def from_pipeline(cls, pipeline, fast_features):
+        clf = pipeline.steps[-1][1]
+        return cls(clf.get_booster(), fast_features, getattr(clf, "best_iteration", None))
+
+    def contributions(self, cols):
+        # (n, n_raw_fields) log-odds contributions and (n,) base values
+        X = self.fast_features.transform(cols)
+        contribs = self.booster.predict(
+            self._xgb.DMatrix(X), pred_contribs=True, iteration_range=self.iteration_range
+        )
+        return contribs[:, :-1] @ self.attribution, contribs[:, -1]
+
+    def explain(self, cols, top_k=5):
+        by_field, base = self.contributions(cols)
+        out = []
+        for i in range(len(base)):
+            order = np.argsort(-np.abs(by_field[i]))[:top_k]
+            out.append({
+                "base_value": float(base[i]),
+                "top_features": [
+                    {
+                        "feature": self.fields[j],
+                        "value": _plain(cols[self.fields[j]][i]),
+                        "contribution": round(float(by_field[i, j]), 4),
+                        "direction": "increases risk" if by_field[i, j] > 0 else "decreases risk",
+                    }
+                    for j in order
+                ],
+            })
+        return out
+
+
+def _plain(value):
+    # numpy scalars -> JSON-friendly Python values
+    return value.item() if hasattr(value, "item") else value
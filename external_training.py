@@ -0,0 +1,161 @@
+# external_training.py
+#
+# Out-of-core training (python train_pipeline.py --external): the data is
+# never fully in memory, only one chunk at a time.
+#
+#   1. One pass over the data keeps a uniform random sample of SAMPLE_ROWS
+#      training rows (to fit FeatureEngineer + the ColumnTransformer: medians,
+#      quantiles, scaler stats and categories only need a sample) and counts
+#      the classes. scale_pos_weight = negatives / positives replaces SMOTE:
+#      same re-balancing effect on the gradients, no synthetic rows and no
+#      neighbour search.
+#   2. An xgboost.DataIter streams the training chunks through the fitted
+#      preprocessing into an external-memory DMatrix (pages cached on disk
+#      under CACHE_DIR) and XGBoost trains on it with tree_method="hist".
+#   3. Hold-out chunks are scored as they stream past; only (label, probability
+#      after overrides.json) is kept, for the decision threshold.
+#
+# Rows go to the hold-out set by a Bernoulli(TEST_SIZE) draw seeded per chunk,
+# so every pass sees the same split. The saved pipeline has the usual
+# feature_engineering -> preprocessing -> model layout (without a smote step),
+# so main.py, compile_model.py etc. load it as before.
+
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from imblearn.pipeline import Pipeline as ImbPipeline
+from xgboost import XGBClassifier
+
+from dataset import iter_dataset
+from preprocessing import FeatureEngineer
+from training_common import RANDOM_STATE, TEST_SIZE, clean_data, preprocess_pipe, with_overrides
+
+# ---------- CONFIG ----------
+CHUNK_ROWS = 200_000            # rows per chunk fed to XGBoost
+SAMPLE_ROWS = 200_000           # training rows used to fit the preprocessing
+CACHE_DIR = ".xgb_external"     # external-memory page cache (deleted afterwards)
+N_ROUNDS = 100                  # boosting rounds (XGBClassifier's default n_estimators)
+# -----------------------------
+
+
+def _split_chunks(path, chunk_rows, holdout):
+    # (X, y) chunks of the training rows, or of the hold-out rows
+    for i, df in enumerate(iter_dataset(path, chunk_rows)):
+        rng = np.random.default_rng([RANDOM_STATE, i])
+        in_holdout = rng.random(len(df)) < TEST_SIZE
+        X, y = clean_data(df[in_holdout == holdout])
+        if len(y):
+            yield X, y
+
+
+def sample_and_count(path, chunk_rows, sample_rows=SAMPLE_ROWS):
+    """Uniform sample of the training rows (the sample_rows with the smallest
+    random keys, kept in bounded memory) + class counts."""
+    rng = np.random.default_rng(RANDOM_STATE)
+    sample, keys = None, None
+    counts = np.zeros(2, dtype=np.int64)
+    for X, y in _split_chunks(path, chunk_rows, holdout=False):
+        counts += np.bincount(y.to_numpy(), minlength=2)[:2]
+        chunk_keys = rng.random(len(y))
+        X = X.assign(stroke=y.to_numpy())
+        if sample is not None:
+            X = pd.concat([sample, X], ignore_index=True)
+            chunk_keys = np.concatenate([keys, chunk_keys])
+        keep = np.argsort(chunk_keys, kind="stable")[:sample_rows]
+        sample, keys = X.iloc[keep].reset_index(drop=True), chunk_keys[keep]
+    return sample.drop(columns="stroke"), sample["stroke"], counts
+
+
+class ChunkIter(xgb.DataIter):
+    """Training chunks -> fitted preprocessing -> XGBoost, one chunk at a time."""
+
+    def __init__(self, path, chunk_rows, transform, cache_prefix):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.transform = transform
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = _split_chunks(self.path, self.chunk_rows, holdout=False)
+        batch = next(self._chunks, None)
+        if batch is None:
+            return False
+        X, y = batch
+        input_data(data=self.transform(X), label=y.to_numpy())
+        return True
+
+    def reset(self):
+        self._chunks = None
+
+
+def train_external(path, params, chunk_rows=CHUNK_ROWS):
+    """Returns (pipeline, hold-out labels, hold-out probabilities with overrides, training info)."""
+    start = time.perf_counter()
+    print(f"📦 Out-of-core training on {path} in chunks of {chunk_rows:,} rows")
+
+    X_sample, y_sample, counts = sample_and_count(path, chunk_rows)
+    n_neg, n_pos = (int(c) for c in counts)
+    print(f"   {n_neg + n_pos:,} training rows ({n_pos:,} positive); "
+          f"preprocessing fitted on {len(y_sample):,} sampled rows")
+
+    fe, pre = FeatureEngineer(), preprocess_pipe(X_sample)
+    pre.fit(fe.fit_transform(X_sample, y_sample), y_sample)
+    del X_sample, y_sample
+
+    def transform(X):
+        out = pre.transform(fe.transform(X))
+        out = out.toarray() if hasattr(out, "toarray") else out
+        return np.asarray(out, dtype=np.float32)
+
+    # the same settings train_pipeline.build_pipeline() gives XGBClassifier, minus SMOTE
+    params = dict(params)
+    n_rounds = params.pop("n_estimators", N_ROUNDS)
+    booster_params = dict(
+        objective="binary:logistic",
+        eval_metric="logloss",
+        tree_method="hist",
+        seed=RANDOM_STATE,
+        scale_pos_weight=n_neg / max(n_pos, 1),
+        **params,
+    )
+
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    os.makedirs(CACHE_DIR)
+    try:
+        dtrain = xgb.DMatrix(ChunkIter(path, chunk_rows, transform, os.path.join(CACHE_DIR, "train")))
+        booster = xgb.train(booster_params, dtrain, num_boost_round=n_rounds)
+        del dtrain
+    finally:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+    # sklearn wrapper around the trained booster, so the artifact looks like train_pipeline's
+    model = XGBClassifier()
+    model.load_model(bytearray(booster.save_raw("json")))
+    pipe = ImbPipeline(steps=[("feature_engineering", fe), ("preprocessing", pre), ("model", model)])
+
+    y_test, probs = [], []
+    for X, y in _split_chunks(path, chunk_rows, holdout=True):
+        y_test.append(y.to_numpy())
+        probs.append(with_overrides(booster.predict(xgb.DMatrix(transform(X))), X))
+    y_test, probs = np.concatenate(y_test), np.concatenate(probs)
+
+    seconds = time.perf_counter() - start
+    print(f"   trained {n_rounds} rounds in {seconds:.1f}s")
+    training = {
+        "mode": "external",
+        "data": path,
+        "chunk_rows": chunk_rows,
+        "n_train": n_neg + n_pos,
+        "n_positive": n_pos,
+        "preprocessing_sample_rows": SAMPLE_ROWS,
+        "scale_pos_weight": booster_params["scale_pos_weight"],
+        "n_rounds": n_rounds,
+        "seconds": seconds,
+    }
+    return pipe, y_test, probs, training
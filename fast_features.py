@@ -0,0 +1,288 @@
+# fast_features.py
+#
+# Pure-NumPy version of FeatureEngineer + the fitted ColumnTransformer.
+# Takes a dict of arrays (or a DataFrame / structured array - anything that
+# supports cols["age"]) and returns the same matrix the "preprocessing" step
+# emits, without building any pandas objects on the serving path.
+
+import numpy as np
+
+RAW_COLUMNS = [
+    "gender", "age", "hypertension", "heart_disease", "ever_married",
+    "work_type", "Residence_type", "avg_glucose_level", "bmi", "smoking_status",
+]
+CATEGORICAL_RAW = {"gender", "ever_married", "work_type", "Residence_type", "smoking_status"}
+
+# Must stay in sync with preprocessing.feature_engineering
+AGE_BINS = np.array([0, 18, 30, 45, 60, 80, 120], dtype=float)
+AGE_LABELS = ['child', 'young_adult', 'adult', 'middle_aged', 'senior', 'elderly']
+BMI_BINS = np.array([-1, 18.5, 25, 30, 35, 40, 45, np.inf])
+BMI_LABELS = ["Underweight", "Normal", "Overweight", "Obese I", "Obese II", "Obese III", "Extreme"]
+SMOKER_FLAGS = {
+    'smokes': 1,
+    'formerly smoked': 1,
+    'never smoked': 0,
+    'unknown': 0,
+}
+
+# Raw StrokeInput fields each engineered feature is computed from, for
+# attributing model contributions back to inputs. Raw columns map to themselves.
+FEATURE_SOURCES = {
+    "age_group": ["age"],
+    "bmi_category": ["bmi"],
+    "glucose_q": ["avg_glucose_level"],
+    "smoker_flag": ["smoking_status"],
+    "senior_flag": ["age"],
+    "bmi_high_flag": ["bmi"],
+    "glucose_high_flag": ["avg_glucose_level"],
+    "cardio_flag": ["hypertension", "heart_disease"],
+    "age_squared": ["age"],
+    "bmi_age_ratio": ["bmi", "age"],
+    "glucose_bmi_ratio": ["avg_glucose_level", "bmi"],
+    "bmi_smoker_interaction": ["bmi", "smoking_status"],
+    "age_bmi_interaction": ["age", "bmi"],
+    "age_glucose_interaction": ["age", "avg_glucose_level"],
+    "age_smoker_interaction": ["age", "smoking_status"],
+    "risk_score": ["smoking_status", "bmi", "avg_glucose_level", "hypertension", "heart_disease", "age"],
+}
+
+
+def glucose_bins(glucose_quantiles):
+    q1, q2, q3 = glucose_quantiles
+    bins = sorted(set([-1, q1, q2, q3, np.inf]))
+    if len(bins) - 1 != 4:
+        labels = [f"Q{i+1}" for i in range(len(bins) - 1)]
+    else:
+        labels = ['low', 'med_low', 'med_high', 'high']
+    return np.array(bins, dtype=float), labels
+
+
+def records_to_columns(records):
+    # list of dicts -> dict of arrays, no DataFrame involved
+    return {
+        name: np.array(
+            [record.get(name) for record in records],
+            dtype=object if name in CATEGORICAL_RAW else float,
+        )
+        for name in RAW_COLUMNS
+    }
+
+
+def _cut(values, bins):
+    # pd.cut semantics (right-closed bins, lowest edge excluded) via
+    # searchsorted. Returns the bin index, or -1 if outside / NaN.
+    idx = np.searchsorted(bins, values, side="left") - 1
+    idx[(idx < 0) | (idx >= len(bins) - 1) | np.isnan(values)] = -1
+    return idx
+
+
+class FastFeatures:
+    """Flat copy of the fitted feature_engineering + preprocessing steps.
+
+    Build it with FastFeatures.from_pipeline(pipe); transform(cols) returns
+    the dense float64 matrix the pipeline would feed to the classifier.
+    """
+
+    def __init__(self, glucose_quantiles, num_columns, num_fill, num_mean,
+                 num_scale, cat_columns, cat_fill, cat_categories):
+        self.glucose_quantiles = tuple(glucose_quantiles)
+        self.glucose_bins, self.glucose_labels = glucose_bins(glucose_quantiles)
+        self.num_columns = list(num_columns)
+        self.num_fill = np.asarray(num_fill, dtype=float)
+        self.num_mean = np.asarray(num_mean, dtype=float)
+        self.num_scale = np.asarray(num_scale, dtype=float)
+        self.cat_columns = list(cat_columns)
+        self.cat_fill = list(cat_fill)
+        self.cat_categories = [list(c) for c in cat_categories]
+
+        # vocabulary lookups: category string -> one-hot position
+        self.cat_lookup = [
+            {value: i for i, value in enumerate(categories)}
+            for categories in self.cat_categories
+        ]
+        # code used when the value is missing (imputer mode), -1 if unknown
+        self.cat_fill_code = [
+            lookup.get(fill, -1) for lookup, fill in zip(self.cat_lookup, self.cat_fill)
+        ]
+        sizes = [len(c) for c in self.cat_categories]
+        self.cat_offsets = len(self.num_columns) + np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(int)
+        self.n_features = len(self.num_columns) + sum(sizes)
+
+    @classmethod
+    def from_pipeline(cls, pipe):
+        # imported here so workers serving a compiled export never load sklearn
+        from sklearn.impute import SimpleImputer
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+        fe = pipe.named_steps["feature_engineering"]
+        if not hasattr(fe, "glucose_quantiles_"):
+            raise ValueError(
+                "Fast path needs a fitted FeatureEngineer step; "
+                "retrain with train_pipeline.py."
+            )
+
+        # Expect exactly the layout built by train_pipeline.preprocess_pipe():
+        # num (imputer -> scaler) first, then cat (imputer -> one-hot)
+        blocks = [
+            (columns, [step for _, step in transformer.steps])
+            for name, transformer, columns in pipe.named_steps["preprocessing"].transformers_
+            if name != "remainder"
+        ]
+        expected = [(SimpleImputer, StandardScaler), (SimpleImputer, OneHotEncoder)]
+        if len(blocks) != 2 or any(
+            len(steps) != 2 or not all(isinstance(s, kind) for s, kind in zip(steps, kinds))
+            for (_, steps), kinds in zip(blocks, expected)
+        ):
+            raise ValueError("Unsupported ColumnTransformer layout for the fast path")
+
+        (num_columns, (num_imputer, scaler)), (cat_columns, (cat_imputer, encoder)) = blocks
+        if encoder.drop_idx_ is not None or encoder.handle_unknown != "ignore":
+            raise ValueError("Fast path expects OneHotEncoder(handle_unknown='ignore') without drop")
+
+        n_num = len(num_columns)
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(n_num)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n_num)
+
+        return cls(
+            glucose_quantiles=fe.glucose_quantiles_,
+            num_columns=num_columns,
+            num_fill=num_imputer.statistics_,
+            num_mean=mean,
+            num_scale=scale,
+            cat_columns=cat_columns,
+            cat_fill=cat_imputer.statistics_,
+            cat_categories=encoder.categories_,
+        )
+
+    # ---------- (de)serialization as plain arrays ----------
+    def to_arrays(self):
+        return {
+            "glucose_quantiles": np.asarray(self.glucose_quantiles, dtype=float),
+            "num_columns": np.asarray(self.num_columns, dtype=str),
+            "num_fill": self.num_fill,
+            "num_mean": self.num_mean,
+            "num_scale": self.num_scale,
+            "cat_columns": np.asarray(self.cat_columns, dtype=str),
+            "cat_fill": np.asarray(self.cat_fill, dtype=str),
+            "cat_values": np.asarray([v for c in self.cat_categories for v in c], dtype=str),
+            "cat_sizes": np.asarray([len(c) for c in self.cat_categories], dtype=np.int64),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        bounds = np.concatenate([[0], np.cumsum(arrays["cat_sizes"])])
+        values = arrays["cat_values"].tolist()
+        return cls(
+            glucose_quantiles=arrays["glucose_quantiles"].tolist(),
+            num_columns=arrays["num_columns"].tolist(),
+            num_fill=arrays["num_fill"],
+            num_mean=arrays["num_mean"],
+            num_scale=arrays["num_scale"],
+            cat_columns=arrays["cat_columns"].tolist(),
+            cat_fill=arrays["cat_fill"].tolist(),
+            cat_categories=[values[a:b] for a, b in zip(bounds[:-1], bounds[1:])],
+        )
+
+    def feature_sources(self):
+        # raw fields behind each column of transform()'s output, in order
+        sources = [FEATURE_SOURCES.get(name, [name]) for name in self.num_columns]
+        for name, categories in zip(self.cat_columns, self.cat_categories):
+            sources += [FEATURE_SOURCES.get(name, [name])] * len(categories)
+        return sources
+
+    # ---------- feature engineering ----------
+    def engineer(self, cols):
+        age = np.asarray(cols["age"], dtype=float)
+        bmi = np.asarray(cols["bmi"], dtype=float)
+        glucose = np.asarray(cols["avg_glucose_level"], dtype=float)
+        hypertension = np.asarray(cols["hypertension"], dtype=float)
+        heart_disease = np.asarray(cols["heart_disease"], dtype=float)
+
+        smoking = np.array([str(s).strip().lower() for s in cols["smoking_status"]], dtype=object)
+        try:
+            smoker_flag = np.array([SMOKER_FLAGS[s] for s in smoking], dtype=float)
+        except KeyError as e:
+            raise ValueError(
+                f"Unknown smoking_status {e.args[0]!r}; expected one of {sorted(SMOKER_FLAGS)} "
+                "(case and surrounding spaces are ignored)"
+            ) from None
+
+        senior_flag = (age >= 65).astype(float)
+        bmi_high_flag = (bmi >= 30).astype(float)
+        glucose_high_flag = (glucose > self.glucose_quantiles[2]).astype(float)
+        cardio_flag = ((hypertension == 1) | (heart_disease == 1)).astype(float)
+
+        bmi_capped = np.minimum(bmi, 50)
+
+        numeric = {
+            "age": age,
+            "hypertension": hypertension,
+            "heart_disease": heart_disease,
+            "avg_glucose_level": glucose,
+            "bmi": bmi,
+            "smoker_flag": smoker_flag,
+            "senior_flag": senior_flag,
+            "bmi_high_flag": bmi_high_flag,
+            "glucose_high_flag": glucose_high_flag,
+            "cardio_flag": cardio_flag,
+            "age_squared": age ** 2,
+            "bmi_age_ratio": bmi_capped / (age + 1),
+            "glucose_bmi_ratio": glucose / (bmi_capped + 1),
+            "bmi_smoker_interaction": bmi_capped * smoker_flag,
+            "age_bmi_interaction": age * bmi_capped,
+            "age_glucose_interaction": age * glucose,
+            "age_smoker_interaction": age * smoker_flag,
+            "risk_score": (
+                smoker_flag * 1.5 +
+                bmi_high_flag * 1.2 +
+                glucose_high_flag * 1.4 +
+                cardio_flag * 1.7 +
+                senior_flag * 1.3
+            ),
+        }
+
+        # categoricals as (bin index, labels) or raw string arrays
+        binned = {
+            "age_group": (_cut(age, AGE_BINS), AGE_LABELS),
+            "bmi_category": (_cut(bmi, BMI_BINS), BMI_LABELS),
+            "glucose_q": (_cut(glucose, self.glucose_bins), self.glucose_labels),
+        }
+        strings = {name: cols[name] for name in CATEGORICAL_RAW}
+        strings["smoking_status"] = smoking
+        return numeric, binned, strings
+
+    def _codes(self, j, name, binned, strings, n):
+        lookup, fill_code = self.cat_lookup[j], self.cat_fill_code[j]
+        if name in binned:
+            idx, labels = binned[name]
+            label_codes = np.array([lookup.get(label, -1) for label in labels] + [fill_code])
+            return label_codes[idx]   # idx == -1 picks the fill code
+
+        values = np.asarray(strings[name], dtype=object)
+        codes = np.empty(n, dtype=int)
+        for i, value in enumerate(values):
+            if value is None or (isinstance(value, float) and np.isnan(value)):
+                codes[i] = fill_code
+            else:
+                codes[i] = lookup.get(value, -1)
+        return codes
+
+    # ---------- full transform ----------
+    def transform(self, cols):
+        numeric, binned, strings = self.engineer(cols)
+        n = len(numeric["age"])
+
+        X = np.zeros((n, self.n_features))
+        num = np.column_stack([numeric[name] for name in self.num_columns])
+        if np.isinf(num).any():
+            # same guard SimpleImputer applies in the sklearn path
+            raise ValueError("Input X contains infinity or a value too large for dtype('float64').")
+        num = np.where(np.isnan(num), self.num_fill, num)
+        X[:, :len(self.num_columns)] = (num - self.num_mean) / self.num_scale
+
+        codes = np.column_stack([
+            self._codes(j, name, binned, strings, n) for j, name in enumerate(self.cat_columns)
+        ])
+        rows, block = np.nonzero(codes >= 0)
+        X[rows, self.cat_offsets[block] + codes[rows, block]] = 1.0
+        return X
@@ -0,0 +1,183 @@
+# hyperparam_search.py
+#
+# Stratified K-fold search over XGBoost parameters (train_pipeline.py --search).
+#
+# FeatureEngineer + ColumnTransformer + the resampler (SMOTE unless
+# train_pipeline.py --imbalance says otherwise) are fitted once per fold and the
+# resulting matrices are saved as .npy files that every trial memory-maps, so
+# a trial only fits XGBoost. Trials run in a process pool (one XGBoost thread
+# each). Inside a trial every fold uses early stopping on its validation fold,
+# and a trial whose running mean average precision falls below PRUNE_RATIO x
+# the best finished trial is stopped before its remaining folds.
+
+import itertools
+import json
+import multiprocessing as mp
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from imblearn.over_sampling import SMOTE
+from sklearn.metrics import average_precision_score
+from sklearn.model_selection import StratifiedKFold
+from xgboost import XGBClassifier
+
+from preprocessing import FeatureEngineer
+
+# ---------- CONFIG ----------
+SEARCH_SPACE = {
+    "max_depth": [2, 3, 4, 5, 6],
+    "min_child_weight": [1, 2, 5, 10],
+    "gamma": [0, 0.1, 0.5, 1.0],
+    "subsample": [0.6, 0.8, 1.0],
+    "colsample_bytree": [0.6, 0.8, 1.0],
+    "learning_rate": [0.03, 0.1, 0.3],
+    "reg_alpha": [0, 0.1, 1.0],
+    "reg_lambda": [0.5, 1.0, 5.0],
+}
+N_FOLDS = 5
+N_TRIALS = 30                   # random search; --grid tries every combination
+MAX_ROUNDS = 1000               # upper bound on trees, early stopping picks the count
+EARLY_STOPPING_ROUNDS = 50
+PRUNE_RATIO = 0.9               # prune if running mean AP < 0.9 x best so far
+MIN_FOLDS_BEFORE_PRUNE = 2
+RANDOM_STATE = 42
+RESULTS_PATH = "reports/search_results.json"
+# -----------------------------
+
+# per-worker state, set by _init_worker
+_folds = None
+_best = None
+
+
+def default_sampler():
+    return SMOTE(random_state=RANDOM_STATE)
+
+
+def build_folds(X, y, make_preprocessor, fold_dir, n_folds=N_FOLDS, make_sampler=default_sampler):
+    # Fit the preprocessing stages on each training fold once and save the
+    # model matrices: (resampled train, validation) per fold. make_sampler()
+    # returning None means no resampling.
+    skf = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=RANDOM_STATE)
+    for k, (train_idx, val_idx) in enumerate(skf.split(X, y)):
+        X_tr, X_val = X.iloc[train_idx], X.iloc[val_idx]
+        fe = FeatureEngineer().fit(X_tr)
+        ct = make_preprocessor(X_tr)
+        Xt = ct.fit_transform(fe.transform(X_tr))
+        Xv = ct.transform(fe.transform(X_val))
+        sampler = make_sampler()
+        Xs, ys = (Xt, y.iloc[train_idx]) if sampler is None else sampler.fit_resample(Xt, y.iloc[train_idx])
+        arrays = {
+            "X_train": Xs, "y_train": ys,
+            "X_val": Xv, "y_val": y.iloc[val_idx],
+        }
+        for name, value in arrays.items():
+            value = value.toarray() if hasattr(value, "toarray") else np.asarray(value)
+            np.save(os.path.join(fold_dir, f"fold{k}_{name}.npy"), value)
+
+
+def _init_worker(fold_dir, n_folds, best):
+    global _folds, _best
+    _folds = [
+        {
+            name: np.load(os.path.join(fold_dir, f"fold{k}_{name}.npy"), mmap_mode="r")
+            for name in ("X_train", "y_train", "X_val", "y_val")
+        }
+        for k in range(n_folds)
+    ]
+    _best = best
+
+
+def _run_trial(trial, params):
+    scores, rounds = [], []
+    for k, fold in enumerate(_folds):
+        model = XGBClassifier(
+            objective="binary:logistic",
+            eval_metric="aucpr",
+            n_estimators=MAX_ROUNDS,
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+            random_state=RANDOM_STATE,
+            n_jobs=1,
+            **params,
+        )
+        model.fit(fold["X_train"], fold["y_train"],
+                  eval_set=[(fold["X_val"], fold["y_val"])], verbose=False)
+        probs = model.predict_proba(fold["X_val"])[:, 1]   # uses best_iteration
+        scores.append(average_precision_score(fold["y_val"], probs))
+        rounds.append(model.best_iteration + 1)
+
+        if k + 1 >= MIN_FOLDS_BEFORE_PRUNE and k + 1 < len(_folds):
+            if np.mean(scores) < PRUNE_RATIO * _best.value:
+                return {"trial": trial, "params": params, "scores": scores,
+                        "mean_ap": float(np.mean(scores)), "n_estimators": None, "pruned": True}
+
+    mean = float(np.mean(scores))
+    with _best.get_lock():
+        _best.value = max(_best.value, mean)
+    return {"trial": trial, "params": params, "scores": scores, "mean_ap": mean,
+            "n_estimators": int(round(np.mean(rounds))), "pruned": False}
+
+
+def candidates(grid=False, n_trials=N_TRIALS, space=SEARCH_SPACE):
+    names = list(space)
+    if grid:
+        return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+    rng = random.Random(RANDOM_STATE)
+    seen, out = set(), []
+    total = int(np.prod([len(v) for v in space.values()]))
+    while len(out) < min(n_trials, total):
+        values = tuple(rng.choice(space[name]) for name in names)
+        if values not in seen:
+            seen.add(values)
+            out.append(dict(zip(names, values)))
+    return out
+
+
+def run_search(X, y, make_preprocessor, n_folds=N_FOLDS, n_trials=N_TRIALS,
+               grid=False, workers=None, results_path=RESULTS_PATH,
+               make_sampler=default_sampler, fixed_params=None):
+    """Returns the best params (including n_estimators) by mean CV average precision.
+    fixed_params (e.g. scale_pos_weight) are added to every trial."""
+    trials = [{**params, **(fixed_params or {})} for params in candidates(grid, n_trials)]
+    workers = workers or os.cpu_count()
+    fold_dir = tempfile.mkdtemp(prefix="stroke_folds_")
+    try:
+        start = time.perf_counter()
+        print(f"🔧 Preprocessing {n_folds} folds once (feature engineering + ColumnTransformer + resampling)...")
+        build_folds(X, y, make_preprocessor, fold_dir, n_folds, make_sampler)
+        print(f"   done in {time.perf_counter() - start:.1f}s")
+
+        print(f"🔍 {len(trials)} trials x {n_folds} folds on {workers} workers...")
+        best = mp.Value("d", 0.0)
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(fold_dir, n_folds, best)) as pool:
+            futures = [pool.submit(_run_trial, i, params) for i, params in enumerate(trials)]
+            for future in as_completed(futures):
+                r = future.result()
+                results.append(r)
+                status = "pruned" if r["pruned"] else f"{r['n_estimators']} trees"
+                print(f"   trial {r['trial']:3d}: AP {r['mean_ap']:.4f} "
+                      f"({len(r['scores'])}/{n_folds} folds, {status})")
+    finally:
+        shutil.rmtree(fold_dir, ignore_errors=True)
+
+    finished = sorted((r for r in results if not r["pruned"]), key=lambda r: -r["mean_ap"])
+    n_pruned = len(results) - len(finished)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Search done in {elapsed:.1f}s ({n_pruned} of {len(results)} trials pruned)")
+
+    if results_path:
+        os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+        with open(results_path, "w") as f:
+            json.dump({"n_folds": n_folds, "seconds": elapsed, "trials": finished
+                       + [r for r in results if r["pruned"]]}, f, indent=2)
+        print(f"   results saved to {results_path}")
+
+    top = finished[0]
+    print(f"🏆 Best AP {top['mean_ap']:.4f} ± {np.std(top['scores']):.4f}: {top['params']}")
+    return {**top["params"], "n_estimators": top["n_estimators"]}
@@ -0,0 +1,106 @@
+# imbalance.py
+#
+# Class-imbalance strategies for train_pipeline.py (--imbalance):
+#
+#   smote         imblearn SMOTE - exact k-NN over the minority rows, then
+#                 synthetic rows until the classes are balanced (the original setup)
+#   approx_smote  ApproxSMOTE below - same interpolation, neighbours searched
+#                 only inside blocks of nearby rows, blocks in parallel
+#   undersample   RandomUnderSampler - drop negatives until balanced; the
+#                 training matrix shrinks instead of growing
+#   weights       no resampling; XGBoost's scale_pos_weight = negatives / positives
+#
+# bench_imbalance.py compares their fit time, peak memory and PR-AUC.
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator
+
+# ---------- CONFIG ----------
+BLOCK_ROWS = 2048               # ApproxSMOTE neighbour-search block size
+# -----------------------------
+
+STRATEGIES = ["smote", "approx_smote", "undersample", "weights"]
+
+
+class ApproxSMOTE(BaseEstimator):
+    """SMOTE with approximate neighbours, as an imblearn-style sampler.
+
+    Minority rows are sorted along a random projection and cut into blocks of
+    block_rows; each row's k nearest neighbours are searched (exactly) only in
+    its own block, so the search costs O(n_minority x block_rows) instead of a
+    tree search over all minority rows, and blocks run on n_jobs threads (the
+    distance matmuls release the GIL). Synthetic rows are then interpolated
+    like SMOTE: x + u * (neighbour - x), u ~ U(0, 1), until the classes are
+    balanced.
+    """
+
+    def __init__(self, k_neighbors=5, block_rows=BLOCK_ROWS, n_jobs=-1, random_state=None):
+        self.k_neighbors = k_neighbors
+        self.block_rows = block_rows
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def fit_resample(self, X, y):
+        X = X.toarray() if hasattr(X, "toarray") else np.asarray(X)
+        y = np.asarray(y)
+        classes, counts = np.unique(y, return_counts=True)
+        minority = classes[np.argmin(counts)]
+        n_new = counts.max() - counts.min()
+        X_min = X[y == minority]
+        k = self.k_neighbors
+        if len(X_min) <= k:
+            raise ValueError(f"Expected more than k_neighbors={k} minority samples, got {len(X_min)}")
+
+        rng = np.random.default_rng(self.random_state)
+        order = np.argsort(X_min @ rng.normal(size=X.shape[1]), kind="stable")
+        bounds = list(range(0, len(order), self.block_rows)) + [len(order)]
+        if len(bounds) > 2 and bounds[-1] - bounds[-2] <= k:
+            del bounds[-2]      # fold a too-small last block into the previous one
+        neighbours = np.empty((len(X_min), k), dtype=np.int64)
+
+        def block_neighbours(idx):
+            block = X_min[idx]
+            sq = (block * block).sum(axis=1)
+            dist = sq[:, None] + sq[None, :] - 2 * block @ block.T
+            np.fill_diagonal(dist, np.inf)
+            neighbours[idx] = idx[np.argpartition(dist, k - 1, axis=1)[:, :k]]
+
+        Parallel(n_jobs=self.n_jobs, prefer="threads")(
+            delayed(block_neighbours)(order[a:b]) for a, b in zip(bounds, bounds[1:])
+        )
+
+        base = rng.integers(0, len(X_min), n_new)
+        other = neighbours[base, rng.integers(0, k, n_new)]
+        gap = rng.random((n_new, 1))
+        X_new = X_min[base] + gap * (X_min[other] - X_min[base])
+        return (
+            np.vstack([X, X_new.astype(X.dtype, copy=False)]),
+            np.concatenate([y, np.full(n_new, minority, dtype=y.dtype)]),
+        )
+
+
+def make_sampler(strategy, random_state=None, n_jobs=-1):
+    """The pipeline's resampling step for a strategy, or None (weights)."""
+    if strategy == "smote":
+        from imblearn.over_sampling import SMOTE
+
+        return SMOTE(random_state=random_state)
+    if strategy == "approx_smote":
+        return ApproxSMOTE(random_state=random_state, n_jobs=n_jobs)
+    if strategy == "undersample":
+        from imblearn.under_sampling import RandomUnderSampler
+
+        return RandomUnderSampler(random_state=random_state)
+    if strategy == "weights":
+        return None
+    raise ValueError(f"Unknown imbalance strategy {strategy!r}; expected one of {STRATEGIES}")
+
+
+def class_weight_params(strategy, y):
+    """Extra XGBoost params for a strategy: scale_pos_weight for "weights"."""
+    if strategy != "weights":
+        return {}
+    y = np.asarray(y)
+    n_pos = int((y == 1).sum())
+    return {"scale_pos_weight": (len(y) - n_pos) / max(n_pos, 1)}
@@ -0,0 +1,237 @@
+# instrumentation.py
+#
+# Lightweight latency/throughput metrics for the API, rendered in Prometheus
+# text format, plus an optional sampling profiler for the scoring threads.
+# Timing a stage is two perf_counter_ns() calls and a bisect into fixed
+# buckets (~1 µs), so it can stay on for every request.
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _Tally
+from contextvars import ContextVar
+
+# seconds; covers ~10 µs kernel calls up to multi-second pandas fallbacks
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+# set by TimingMiddleware when a request arrives
+request_started = ContextVar("request_started", default=None)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = list(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.bounds + ["+Inf"], self.counts):
+            cumulative += n
+            lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {self.sum}")
+        lines.append(f"{name}_count{_labels(labels)} {self.count}")
+        return lines
+
+
+class _StageTimer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc):
+        self.metrics.observe_stage(self.stage, (time.perf_counter_ns() - self.start) / 1e9)
+
+
+class Metrics:
+    """Per-stage and per-request histograms, counters and scrape-time callbacks."""
+
+    def __init__(self, prefix="stroke"):
+        self.prefix = prefix
+        self.stage_seconds = {}
+        self.request_seconds = {}
+        self.counters = _Tally()
+        self.callbacks = []
+        self._lock = threading.Lock()
+
+    # ---------- recording ----------
+    def stage(self, name):
+        return _StageTimer(self, name)
+
+    def observe_stage(self, name, seconds):
+        hist = self.stage_seconds.get(name)
+        if hist is None:
+            hist = self.stage_seconds.setdefault(name, Histogram())
+        hist.observe(seconds)
+
+    def observe_request(self, path, seconds):
+        hist = self.request_seconds.get(path)
+        if hist is None:
+            hist = self.request_seconds.setdefault(path, Histogram())
+        hist.observe(seconds)
+
+    def observe_since_request(self, stage):
+        # time from the request hitting the middleware to now, e.g. body
+        # parsing + pydantic validation when called at the top of a handler
+        start = request_started.get()
+        if start is not None:
+            self.observe_stage(stage, (time.perf_counter_ns() - start) / 1e9)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] += amount
+
+    def register_callback(self, name, kind, help_text, fn):
+        # value read at scrape time, e.g. cache counters kept elsewhere
+        self.callbacks.append((name, kind, help_text, fn))
+
+    # ---------- Prometheus text format ----------
+    def render(self):
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_stage_seconds Time spent in each scoring stage.",
+            f"# TYPE {p}_stage_seconds histogram",
+        ]
+        for stage, hist in sorted(self.stage_seconds.items()):
+            lines += hist.render(f"{p}_stage_seconds", (("stage", stage),))
+
+        lines += [
+            f"# HELP {p}_request_seconds End-to-end request latency.",
+            f"# TYPE {p}_request_seconds histogram",
+        ]
+        for path, hist in sorted(self.request_seconds.items()):
+            lines += hist.render(f"{p}_request_seconds", (("path", path),))
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {p}_{name} counter")
+            lines.append(f"{p}_{name}{_labels(labels)} {value}")
+
+        for name, kind, help_text, fn in self.callbacks:
+            lines += [
+                f"# HELP {p}_{name} {help_text}",
+                f"# TYPE {p}_{name} {kind}",
+                f"{p}_{name} {fn()}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+class TimingMiddleware:
+    """Pure ASGI middleware: request latency + request/error counters per path."""
+
+    def __init__(self, app, metrics, paths):
+        self.app = app
+        self.metrics = metrics
+        self.paths = set(paths)   # anything else is reported as "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter_ns()
+        token = request_started.set(start)
+        path = scope["path"] if scope["path"] in self.paths else "other"
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_started.reset(token)
+            self.metrics.observe_request(path, (time.perf_counter_ns() - start) / 1e9)
+            self.metrics.inc("requests_total", path=path)
+            if status >= 400:
+                self.metrics.inc("http_errors_total", path=path, status=status)
+
+
+class StackSampler:
+    """Samples the stacks of threads whose name starts with `thread_prefix`
+    and aggregates them as folded stacks ("a;b;c 42"), ready for
+    flamegraph.pl / speedscope.
+    """
+
+    def __init__(self, thread_prefix="scoring", interval=0.005):
+        self.thread_prefix = thread_prefix
+        self.interval = interval
+        self.samples = _Tally()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self.samples.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.folded()
+
+    def folded(self):
+        return "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread in threading.enumerate():
+                if not thread.name.startswith(self.thread_prefix):
+                    continue
+                frame = frames.get(thread.ident)
+                if frame is None or self._idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    @staticmethod
+    def _idle(frame):
+        # executor threads parked on their work queue aren't scoring anything
+        return frame.f_code.co_name == "_worker" and frame.f_code.co_filename.endswith(
+            os.path.join("concurrent", "futures", "thread.py"))
@@ -1,17 +1,72 @@
 # main.py
 
-import joblib
-import json
-import pandas as pd
-from fastapi import FastAPI
-from pydantic import BaseModel, Extra
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Extra, ValidationError
+from fast_features import RAW_COLUMNS, records_to_columns
+from model_registry import ModelRegistry
+from batching import MicroBatcher
+from request_log import RequestLogger
+from prediction_cache import PredictionCache, canonicalize
+from instrumentation import Metrics, TimingMiddleware, StackSampler
+
+# ---------- CONFIG ----------
+MODEL_PATH = os.getenv("MODEL_PATH", "xgb_pipe.joblib")
+META_PATH = os.getenv("META_PATH", "model_meta.json")
+OVERRIDES_PATH = os.getenv("OVERRIDES_PATH", "overrides.json") # logic-based overrides table
+KERNEL_PATH = os.getenv("KERNEL_PATH", "xgb_kernel.npz")     # from compile_model.py, optional
+# Serve only the memory-mapped export from compile_model.py --export-dir: no
+# joblib/pandas/sklearn/xgboost in the process, and uvicorn --workers N share
+# one copy of the model pages. "" = load xgb_pipe.joblib as usual.
+MODEL_EXPORT_DIR = os.getenv("MODEL_EXPORT_DIR", "")
+MODEL_POLL_SECONDS = float(os.getenv("MODEL_POLL_SECONDS", "5"))  # 0 = no hot reload
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", "4"))      # scoring threads per process
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "0"))    # 0 = no micro-batching
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "64"))       # flush a micro-batch early at this size
+REQUEST_LOG_PATH = os.getenv("REQUEST_LOG_PATH", "logs/requests.jsonl")     # "" = no request log
+REQUEST_LOG_SAMPLE = float(os.getenv("REQUEST_LOG_SAMPLE", "1.0"))          # fraction of requests logged
+REQUEST_LOG_MAX_BYTES = int(os.getenv("REQUEST_LOG_MAX_BYTES", "50000000")) # rotate past this size
+CACHE_SIZE = int(os.getenv("CACHE_SIZE", "10000"))            # 0 = no prediction cache
+CACHE_TTL = float(os.getenv("CACHE_TTL", "3600"))             # seconds
+# Round floats to this many digits before scoring, with or without the cache
+# ("" = exact floats). 2 matches the data's resolution and raises the hit rate,
+# but values that round across a bin/override edge (e.g. BMI 39.995 -> 40.0)
+# score differently.
+CACHE_FLOAT_DIGITS = os.getenv("CACHE_FLOAT_DIGITS", "")
+ENABLE_PROFILER = os.getenv("ENABLE_PROFILER", "0") == "1"    # expose /profile/start + /profile/stop
+# -----------------------------
 
 app = FastAPI()
 
-# Load trained model + metadata
-model = joblib.load("xgb_pipe.joblib")
-meta = json.load(open("model_meta.json"))
-THRESHOLD = meta.get("threshold", 0.5)
+# Per-stage timing histograms + request counters, scraped from /metrics
+metrics = Metrics()
+app.add_middleware(
+    TimingMiddleware,
+    metrics=metrics,
+    paths=["/", "/predict", "/predict_batch", "/explain", "/metrics", "/cache_stats", "/model"],
+)
+
+
+def on_model_swap(loaded):
+    # cache keys include the version, this just frees the old entries
+    if cache is not None:
+        cache.clear()
+
+
+# Load trained model + metadata + overrides. The registry polls the files and swaps in a
+# retrained model in the background; each request uses registry.current as it
+# was when the request started.
+registry = ModelRegistry(
+    MODEL_PATH, META_PATH, KERNEL_PATH,
+    poll_interval=MODEL_POLL_SECONDS,
+    on_swap=on_model_swap,
+    export_dir=MODEL_EXPORT_DIR or None,
+    overrides_path=OVERRIDES_PATH,
+)
 
 # Input schema
 class StrokeInput(BaseModel):
@@ -34,90 +89,305 @@ class StrokeInput(BaseModel):
 def home():
     return {"message": "Stroke API is working!"}
 
-# Prediction endpoint
-@app.post("/predict")
-def predict(data: StrokeInput):
-    try:
-        # Convert input to DataFrame
-        X_raw = pd.DataFrame([data.dict()])
-
-        # Model prediction (pipeline includes feature engineering)
-        prob = model.predict_proba(X_raw)[0][1]
-
-        # === Logic-based overrides ===
-        bmi = X_raw["bmi"].iloc[0]
-        smoking_status = X_raw["smoking_status"].iloc[0]
-        residence = X_raw["Residence_type"].iloc[0]
-        glucose = X_raw["avg_glucose_level"].iloc[0]
-        
-        if residence == "Rural":
-            prob -= 0.02  # slight decrease if it over-inflates risk
-        elif residence == "Urban":
-            prob += 0.00  # no change
-
-
-        if smoking_status == "smokes":
-            prob += 0.06
-        elif smoking_status == "formerly smoked":
-            prob += 0.02
-        elif smoking_status == "never smoked":
-            prob += 0.00
-        elif smoking_status == "Unknown":
-            prob += 0.01
-
-        # 📌 BMI logic (more granular)
-        if bmi < 16:
-            prob += 0.05  # severe underweight
-        elif bmi < 18.5:
-         prob += 0.03  # underweight
-        elif 30 <= bmi < 35:
-            prob += 0.02  # obese I
-        elif 35 <= bmi < 40:
-            prob += 0.05  # obese II
-        elif 40 <= bmi < 50:
-            prob += 0.08  # obese III
-        elif 50 <= bmi < 60:
-            prob += 0.12  # obese III
-        elif 70 <= bmi < 80:
-            prob += 0.15  # obese III
-        elif 80 <= bmi < 90:
-            prob += 0.20  # obese III
-        elif bmi >= 90:
-            prob += 0.28
-        
-
-        if glucose < 70:
-            prob += 0.03  # hypoglycemia
-        elif 100 <= glucose < 126:
-            prob += 0.02  # prediabetic
-        elif 126 <= glucose < 200:
-            prob += 0.05  # diabetic
-        elif 200 <= glucose < 300:
-            prob += 0.10  # high diabetic
-        elif glucose >= 300:
-            prob += 0.15  # extreme hyperglycemia
-
-
-
-        # Clip to valid range
-        prob = min(max(float(prob), 0), 1)
-
-        # Risk label
-        label = "high" if prob >= THRESHOLD else ("medium" if prob >= 0.15 else "low")
-        print("✔️ Raw input:", X_raw.to_dict(orient="records"))
-        print("✔️ Probability:", prob)
-        
-        if prob is None:
-            raise ValueError("❌ Model returned None for probability. Check input format or pipeline.")
-
-
-
-        return {
-            "probability": round(prob, 3),
-            "percent": round(prob * 100),
-            "risk_level": label.upper(),    # <-- optional: match Streamlit expectation
-            "threshold": float(THRESHOLD)
+
+def format_prediction(prob, active):
+    prob = float(prob)
+    threshold = active.threshold
+
+    # Risk label
+    label = "high" if prob >= threshold else ("medium" if prob >= 0.15 else "low")
+
+    return {
+        "probability": round(prob, 3),
+        "percent": round(prob * 100),
+        "risk_level": label.upper(),    # <-- optional: match Streamlit expectation
+        "threshold": float(threshold),
+        "model_version": active.version,
+    }
+
+
+def score(cols, active):
+    model = active.pipeline
+    if active.kernel is not None:
+        with metrics.stage("features"):
+            X = active.kernel.features.transform(cols)
+        with metrics.stage("model"):
+            probs = active.kernel.trees.predict(X)
+    elif active.fast_features is not None:
+        # Skip pandas: build the model matrix directly, then the classifier
+        with metrics.stage("features"):
+            X = active.fast_features.transform(cols)
+        with metrics.stage("model"):
+            probs = model.steps[-1][1].predict_proba(X)[:, 1]
+    else:
+        # Same steps model.predict_proba runs (SMOTE is skipped at predict time)
+        import pandas as pd
+
+        with metrics.stage("dataframe"):
+            X = pd.DataFrame(cols)
+        with metrics.stage("feature_engineering"):
+            X = model.named_steps["feature_engineering"].transform(X)
+        with metrics.stage("preprocessing"):
+            X = model.named_steps["preprocessing"].transform(X)
+        with metrics.stage("model"):
+            probs = model.steps[-1][1].predict_proba(X)[:, 1]
+    # === Logic-based overrides (overrides.json) ===
+    with metrics.stage("overrides"):
+        return active.overrides.apply(probs, cols)
+
+
+def score_records(records, active):
+    with metrics.stage("columns"):
+        cols = records_to_columns(records)
+    metrics.inc("records_scored_total", len(records))
+    return score(cols, active)
+
+
+def score_pairs(pairs):
+    # Micro-batches are (active model, record) pairs; a batch straddling a
+    # model swap scores each record with the version its request started on.
+    probs = [None] * len(pairs)
+    for active in {id(a): a for a, _ in pairs}.values():
+        idx = [i for i, (a, _) in enumerate(pairs) if a is active]
+        for i, prob in zip(idx, score_records([pairs[i][1] for i in idx], active)):
+            probs[i] = prob
+    return probs
+
+
+def explain_records(records, active, top_k):
+    # prediction + top contributing input fields (TreeSHAP, log-odds) + which
+    # override rules moved the probability. Not cached or micro-batched.
+    if active.explainer is None:
+        raise ValueError("Explanations need the XGBoost booster + FastFeatures "
+                         "(not loaded with MODEL_EXPORT_DIR or an unsupported pipeline layout)")
+    with metrics.stage("columns"):
+        cols = records_to_columns(records)
+    metrics.inc("records_scored_total", len(records))
+    probs = score(cols, active)
+    with metrics.stage("explain"):
+        explanations = active.explainer.explain(cols, top_k)
+    overrides = active.overrides.breakdown(cols, len(records))
+    results = []
+    for i, (prob, explanation) in enumerate(zip(probs, explanations)):
+        for item in explanation["top_features"]:
+            item["value"] = records[i][item["feature"]]   # as sent, not as a float column
+        explanation["overrides"] = {
+            field: float(adjust[i]) for field, adjust in overrides.items() if adjust[i] != 0
         }
+        results.append({**format_prediction(prob, active), "explanation": explanation})
+    return results
+
+
+# CPU-bound scoring runs on its own executor instead of Starlette's shared
+# threadpool, so the event loop stays free to accept requests under bursts
+executor = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix="scoring")
+batcher = (
+    MicroBatcher(score_pairs, executor, BATCH_WINDOW_MS, MAX_BATCH_SIZE)
+    if BATCH_WINDOW_MS > 0 else None
+)
+
+
+async def score_async(records, active):
+    if batcher is not None and len(records) == 1:
+        return [await batcher.submit((active, records[0]))]
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, score_records, records, active)
+
+
+# Repeat submissions (e.g. pressing "Predict" twice) are answered from the
+# cache without touching the model. The model version is part of the key.
+cache = (
+    PredictionCache(
+        max_size=CACHE_SIZE,
+        ttl=CACHE_TTL,
+    )
+    if CACHE_SIZE > 0 else None
+)
+
+
+def canonical_records(records):
+    # done for every request, so CACHE_SIZE=0 and a cache hit score the same input
+    digits = int(CACHE_FLOAT_DIGITS) if CACHE_FLOAT_DIGITS else None
+    return [canonicalize(record, digits) for record in records]
+
+
+async def score_cached(records, active):
+    records = canonical_records(records)
+    if cache is None:
+        return await score_async(records, active)
+
+    with metrics.stage("cache_lookup"):
+        keys = [cache.key(record, active.cache_version) for record in records]
+        probs = [cache.get(key) for key in keys]
+
+    misses = [i for i, prob in enumerate(probs) if prob is None]
+    if misses:
+        fresh = await score_async([records[i] for i in misses], active)
+        for i, prob in zip(misses, fresh):
+            probs[i] = float(prob)
+            cache.put(keys[i], probs[i])
+    return probs
+
+
+# Structured request/response log, written off the request path
+request_log = (
+    RequestLogger(REQUEST_LOG_PATH, max_bytes=REQUEST_LOG_MAX_BYTES, sample_rate=REQUEST_LOG_SAMPLE)
+    if REQUEST_LOG_PATH else None
+)
+
+
+def log_requests(endpoint, records, results):
+    if request_log is not None:
+        for record, result in zip(records, results):
+            request_log.log(endpoint, record, result)
+
 
+@app.on_event("startup")
+def start_model_polling():
+    registry.start()
+
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    registry.stop()
+    executor.shutdown(wait=False)
+    if request_log is not None:
+        request_log.close()
+
+
+@app.get("/model")
+def model_info():
+    active = registry.current
+    return {
+        "model_version": active.version,
+        "backend": active.backend,
+        "threshold": float(active.threshold),
+        "overrides_version": active.overrides.version,
+        "loaded_at": active.loaded_at,
+        "reloads": registry.reloads,
+        "failed_reloads": registry.failed_reloads,
+    }
+
+
+@app.get("/cache_stats")
+def cache_stats():
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+if cache is not None:
+    metrics.register_callback("cache_hits_total", "counter", "Prediction cache hits.", lambda: cache.hits)
+    metrics.register_callback("cache_misses_total", "counter", "Prediction cache misses.", lambda: cache.misses)
+    metrics.register_callback("cache_evictions_total", "counter", "Prediction cache evictions.", lambda: cache.evictions)
+    metrics.register_callback("cache_entries", "gauge", "Entries in the prediction cache.", lambda: len(cache))
+if request_log is not None:
+    metrics.register_callback("request_log_dropped_total", "counter", "Request log records dropped (queue full).", lambda: request_log.dropped)
+    metrics.register_callback("request_log_write_failures_total", "counter", "Failed request log writes.", lambda: request_log.write_failures)
+    metrics.register_callback("request_log_failed_records_total", "counter", "Request log records lost to failed writes.", lambda: request_log.failed_records)
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# Optional sampling profiler for the scoring threads (ENABLE_PROFILER=1).
+# /profile/stop returns folded stacks for flamegraph.pl or speedscope.
+profiler = StackSampler(thread_prefix="scoring")
+
+
+@app.post("/profile/start")
+def profile_start(interval_ms: float = Query(5.0, gt=0, le=1000)):
+    if not ENABLE_PROFILER:
+        raise HTTPException(status_code=404, detail="Profiler disabled (set ENABLE_PROFILER=1)")
+    profiler.interval = interval_ms / 1000
+    profiler.start()
+    return {"profiling": True, "interval_ms": interval_ms}
+
+
+@app.post("/profile/stop")
+def profile_stop():
+    if not ENABLE_PROFILER:
+        raise HTTPException(status_code=404, detail="Profiler disabled (set ENABLE_PROFILER=1)")
+    return PlainTextResponse(profiler.stop())
+
+
+async def predict_records(records, active, endpoint, explain=False, top_k=5):
+    # One result per record, in input order. The whole list is scored in one
+    # vectorized call; if that fails, the records are retried one by one so a
+    # bad record gets its own error instead of failing the others.
+    try:
+        if explain:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, explain_records, canonical_records(records), active, top_k)
+        return [format_prediction(prob, active) for prob in await score_cached(records, active)]
     except Exception as e:
-        return {"error": str(e)}
+        if len(records) == 1:
+            metrics.inc("prediction_errors_total", path=endpoint)
+            return [{"error": str(e), "model_version": active.version}]
+    results = []
+    for record in records:
+        results += await predict_records([record], active, endpoint, explain, top_k)
+    return results
+
+
+async def predict_one(data, endpoint, explain=False, top_k=5):
+    metrics.observe_since_request("parse_validate")
+
+    active = registry.current
+    records = [data.dict()]
+    results = await predict_records(records, active, endpoint, explain, top_k)
+    log_requests(endpoint, records, results)
+    return results[0]
+
+
+def validation_message(error):
+    # "age: Input should be a valid number; bmi: Field required"
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors())
+
+
+# 1..number of input fields, so a bad ?top_k= is a 422 instead of a silent slice
+TOP_K = Query(5, ge=1, le=len(RAW_COLUMNS))
+
+
+# Prediction endpoint; ?explain=true adds the same "explanation" block as /explain
+@app.post("/predict")
+async def predict(data: StrokeInput, explain: bool = False, top_k: int = TOP_K):
+    return await predict_one(data, "/predict", explain, top_k)
+
+
+# Why did I get this score? Top contributing inputs for one request
+@app.post("/explain")
+async def explain(data: StrokeInput, top_k: int = TOP_K):
+    return await predict_one(data, "/explain", explain=True, top_k=top_k)
+
+
+# Batch prediction endpoint: one predict_proba call for the whole list. Each
+# record is validated and scored on its own terms, like a /predict call: the
+# response has one prediction or error per record, in input order. Only a body
+# that isn't a list of objects fails the whole request (422).
+@app.post("/predict_batch")
+async def predict_batch(data: List[Dict[str, Any]], explain: bool = False, top_k: int = TOP_K):
+    metrics.observe_since_request("parse_validate")
+    if not data:
+        return {"predictions": []}
+
+    active = registry.current
+    results = [None] * len(data)
+    records, valid = [], []
+    for i, item in enumerate(data):
+        try:
+            records.append(StrokeInput(**item).dict())
+            valid.append(i)
+        except ValidationError as e:
+            metrics.inc("prediction_errors_total", path="/predict_batch")
+            results[i] = {"error": f"Invalid record: {validation_message(e)}", "model_version": active.version}
+
+    if records:
+        for i, result in zip(valid, await predict_records(records, active, "/predict_batch", explain, top_k)):
+            results[i] = result
+
+    logged = list(data)
+    for i, record in zip(valid, records):
+        logged[i] = record
+    log_requests("/predict_batch", logged, results)
+    return {"predictions": results}
@@ -0,0 +1,126 @@
+# measure_workers.py
+#
+# Per-worker memory and cold-start cost of serving main.py with N uvicorn
+# workers. Each worker is a fresh interpreter that imports main (which loads
+# the model) and scores one record, like `uvicorn main:app --workers N`.
+# Once every worker is up, RSS / PSS / private memory are read from
+# /proc/<pid>/smaps_rollup (Linux only). PSS splits shared pages between the
+# processes mapping them, so it's the number that shows what the memory-mapped
+# export saves as the worker count grows.
+#
+#   python compile_model.py --export-dir          # build xgb_kernel/ first
+#   python measure_workers.py                     # joblib vs mmap, 1/2/4 workers
+#   python measure_workers.py --workers 8 --modes mmap
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# ---------- CONFIG ----------
+EXPORT_DIR = "xgb_kernel"       # from compile_model.py --export-dir
+WORKER_COUNTS = "1,2,4"
+MODES = "joblib,mmap"
+# -----------------------------
+
+
+def child():
+    # one "worker": import the app (loads the model), score once so the model
+    # pages are actually touched, then report and stay alive until told to exit
+    import main
+    from model_registry import SMOKE_RECORD
+
+    main.score_records([SMOKE_RECORD], main.registry.current)
+    print(f"ready {main.registry.current.backend}", flush=True)
+    sys.stdin.read()
+
+
+def smaps_rollup(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "private": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def run(mode, n_workers, export_dir):
+    env = dict(
+        os.environ,
+        MODEL_EXPORT_DIR=export_dir if mode == "mmap" else "",
+        REQUEST_LOG_PATH="",
+        MODEL_POLL_SECONDS="0",
+    )
+    # started together, like uvicorn forking its workers
+    start = time.perf_counter()
+    procs = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--child"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env, text=True,
+        )
+        for _ in range(n_workers)
+    ]
+    try:
+        cold_start, backend = [], None
+        for proc in procs:
+            line = proc.stdout.readline()
+            if not line.startswith("ready"):
+                raise SystemExit(f"❌ {mode} worker failed to start (exit code {proc.wait()})")
+            cold_start.append(time.perf_counter() - start)
+            backend = line.split()[1]
+        memory = [smaps_rollup(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+
+    mean = lambda key: sum(m[key] for m in memory) / n_workers
+    return {
+        "mode": mode,
+        "backend": backend,
+        "workers": n_workers,
+        "cold_start": sum(cold_start) / n_workers,
+        "cold_start_max": max(cold_start),
+        "rss": mean("rss"),
+        "pss": mean("pss"),
+        "private": mean("private"),
+        "total_pss": sum(m["pss"] for m in memory),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker RSS and cold-start time: joblib vs mmap export")
+    parser.add_argument("--workers", default=WORKER_COUNTS, help="comma-separated worker counts")
+    parser.add_argument("--modes", default=MODES, help="joblib and/or mmap")
+    parser.add_argument("--export-dir", default=EXPORT_DIR)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        raise SystemExit("❌ Needs Linux /proc/<pid>/smaps_rollup")
+    modes = args.modes.split(",")
+    if "mmap" in modes and not os.path.exists(os.path.join(args.export_dir, "manifest.json")):
+        raise SystemExit(f"❌ {args.export_dir}/ not found - run: python compile_model.py --export-dir {args.export_dir}")
+
+    print(f"{'mode':8s}{'backend':>10s}{'workers':>9s}{'cold start s':>14s}{'max s':>8s}"
+          f"{'RSS MB':>9s}{'PSS MB':>9s}{'private MB':>12s}{'total PSS MB':>14s}")
+    for mode in modes:
+        for n in [int(n) for n in args.workers.split(",")]:
+            r = run(mode, n, args.export_dir)
+            print(f"{r['mode']:8s}{r['backend']:>10s}{r['workers']:>9d}{r['cold_start']:>14.2f}"
+                  f"{r['cold_start_max']:>8.2f}{r['rss']:>9.1f}{r['pss']:>9.1f}"
+                  f"{r['private']:>12.1f}{r['total_pss']:>14.1f}")
+    print("\nRSS/PSS/private are per-worker means; cold start = launch to first scored record.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# model_registry.py
+#
+# Holds the model the API is serving and hot-swaps it when xgb_pipe.joblib /
+# model_meta.json / overrides.json (or the compiled kernel) change on disk. A background thread
+# polls the files, loads the new version off the request path, smoke-tests
+# it and then replaces the reference in one assignment, so in-flight requests
+# finish on the version they started with and nothing restarts.
+#
+# Deploy new artifacts with an atomic rename (write to a temp file, then
+# os.replace) - the poller also waits for the files to stop changing.
+#
+# With export_dir set (MODEL_EXPORT_DIR) the registry serves the memory-mapped
+# export from compile_model.py --export-dir instead and never imports joblib,
+# pandas, sklearn or xgboost - the mode to use with several uvicorn workers.
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from fast_features import FastFeatures, records_to_columns
+from compile_model import CompiledModel, file_sha256, load_if_current
+from overrides import OverrideTable
+from explain import Explainer
+
+logger = logging.getLogger(__name__)
+
+# Used to validate a freshly loaded model before it goes live
+SMOKE_RECORD = {
+    "gender": "Male",
+    "age": 67.0,
+    "hypertension": 0,
+    "heart_disease": 1,
+    "ever_married": "Yes",
+    "work_type": "Private",
+    "Residence_type": "Urban",
+    "avg_glucose_level": 228.69,
+    "bmi": 36.6,
+    "smoking_status": "formerly smoked",
+}
+
+
+@dataclass
+class LoadedModel:
+    """Everything the API needs from one artifact version."""
+    version: str
+    pipeline: object                # None when serving a compiled export
+    meta: dict
+    overrides: object = None        # OverrideTable applied after the model
+    fast_features: object = None    # FastFeatures, or None for unsupported layouts
+    kernel: object = None           # CompiledModel, or None if not compiled
+    explainer: object = None        # Explainer, needs the booster + FastFeatures
+    loaded_at: float = field(default_factory=time.time)
+
+    @property
+    def threshold(self):
+        return self.meta.get("threshold", 0.5)
+
+    @property
+    def cache_version(self):
+        # cached probabilities include the overrides, so both versions count
+        overrides = self.overrides.version if self.overrides is not None else ""
+        return f"{self.version}:{overrides}"
+
+    @property
+    def backend(self):
+        if self.kernel is not None:
+            return "kernel"
+        return "fast_features" if self.fast_features is not None else "pipeline"
+
+
+def load_model(model_path, meta_path, kernel_path, overrides_path):
+    import joblib
+
+    from preprocessing import upgrade_legacy_pipeline
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+    # pipelines saved before FeatureEngineer get the training glucose quartiles
+    # from meta, so a row's score doesn't depend on the batch it came in
+    pipeline = upgrade_legacy_pipeline(joblib.load(model_path), meta)
+
+    # NumPy fast path for feature engineering + preprocessing; unsupported
+    # preprocessing layouts fall back to the full pandas pipeline.
+    try:
+        fast_features = FastFeatures.from_pipeline(pipeline)
+    except ValueError:
+        fast_features = None
+    # built once here so /explain only pays for one pred_contribs call
+    explainer = Explainer.from_pipeline(pipeline, fast_features) if fast_features is not None else None
+
+    return LoadedModel(
+        version=file_sha256(model_path)[:12],
+        pipeline=pipeline,
+        meta=meta,
+        overrides=OverrideTable.load(overrides_path),
+        fast_features=fast_features,
+        explainer=explainer,
+        # only used if it was compiled from this exact xgb_pipe.joblib
+        kernel=load_if_current(kernel_path, model_path),
+    )
+
+
+def load_export(export_dir, meta_path, overrides_path):
+    with open(meta_path) as f:
+        meta = json.load(f)
+    kernel = CompiledModel.load_dir(export_dir)
+    return LoadedModel(
+        # same version string as load_model() for the pipeline it came from
+        version=kernel.source_hash[:12],
+        pipeline=None,
+        meta=meta,
+        overrides=OverrideTable.load(overrides_path),
+        fast_features=kernel.features,
+        kernel=kernel,
+    )
+
+
+def smoke_test(loaded):
+    # The serving backend must return a sane probability for a known record
+    # and agree with the full pipeline on it.
+    cols = records_to_columns([SMOKE_RECORD])
+    adjusted = loaded.overrides.apply([0.5], cols)[0]
+    if not np.isfinite(adjusted):
+        raise ValueError(f"overrides returned {adjusted!r}")
+    if loaded.pipeline is None:
+        # compiled export: parity was checked by compile_model.py --check
+        got = loaded.kernel.predict_proba(cols)[0, 1]
+        if not (np.isfinite(got) and 0 <= got <= 1):
+            raise ValueError(f"smoke test returned {got!r}")
+        return
+
+    import pandas as pd
+
+    expected = loaded.pipeline.predict_proba(pd.DataFrame(cols))[0, 1]
+    if loaded.kernel is not None:
+        got = loaded.kernel.predict_proba(cols)[0, 1]
+    elif loaded.fast_features is not None:
+        got = loaded.pipeline.steps[-1][1].predict_proba(loaded.fast_features.transform(cols))[0, 1]
+    else:
+        got = expected
+    if not (np.isfinite(got) and 0 <= got <= 1):
+        raise ValueError(f"smoke test returned {got!r}")
+    if abs(got - expected) > 1e-5:
+        raise ValueError(f"{loaded.backend} disagrees with the pipeline ({got} vs {expected})")
+
+
+class ModelRegistry:
+    """Serves `current` and reloads it in the background when files change."""
+
+    def __init__(self, model_path, meta_path, kernel_path, poll_interval=5.0,
+                 on_swap=None, export_dir=None, overrides_path="overrides.json"):
+        if export_dir:
+            # the directory is swapped in whole, so the manifest changes on every re-export
+            self.paths = (os.path.join(export_dir, "manifest.json"), meta_path, overrides_path)
+            self._load = lambda: load_export(export_dir, meta_path, overrides_path)
+        else:
+            self.paths = (model_path, meta_path, kernel_path, overrides_path)
+            self._load = lambda: load_model(model_path, meta_path, kernel_path, overrides_path)
+        self.poll_interval = poll_interval
+        self.on_swap = on_swap
+        self.reloads = 0
+        self.failed_reloads = 0
+        # same checks as a reload: refuse to start rather than serve a broken model
+        self.current = self._load()
+        smoke_test(self.current)
+        self._fingerprint = self._stat()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.poll_interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="model-registry", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _stat(self):
+        fingerprint = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                fingerprint.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                fingerprint.append(None)
+        return tuple(fingerprint)
+
+    def _run(self):
+        pending = None
+        while not self._stop.wait(self.poll_interval):
+            fingerprint = self._stat()
+            if fingerprint == self._fingerprint:
+                pending = None
+            elif fingerprint != pending:
+                # changed since last poll - wait until it stops changing
+                pending = fingerprint
+            else:
+                self.reload(fingerprint)
+                pending = None
+
+    def reload(self, fingerprint=None):
+        fingerprint = fingerprint or self._stat()
+        try:
+            loaded = self._load()
+            smoke_test(loaded)
+        except Exception as e:
+            # keep serving the old model; don't retry until the files change again
+            self.failed_reloads += 1
+            self._fingerprint = fingerprint
+            logger.error("model reload failed, still serving %s: %s", self.current.version, e)
+            return False
+
+        previous, self.current = self.current, loaded
+        self._fingerprint = fingerprint
+        self.reloads += 1
+        logger.info("model %s -> %s (%s)", previous.version, loaded.version, loaded.backend)
+        if self.on_swap is not None:
+            self.on_swap(loaded)
+        return True
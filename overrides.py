@@ -0,0 +1,79 @@
+# overrides.py
+#
+# Logic-based safety overrides as data. overrides.json (next to model_meta.json)
+# lists one rule per input field:
+#
+#   {"field": "bmi", "edges": [16, 18.5, ...], "deltas": [0.05, 0.03, 0.0, ...]}
+#       numeric bins: deltas[i] applies to edges[i-1] <= x < edges[i], so
+#       there is one more delta than edges (below the first / from the last)
+#   {"field": "smoking_status", "values": {"smokes": 0.06, ...}}
+#       exact (case-sensitive) matches; anything else gets 0
+#
+# The deltas of all rules are summed onto the model probability and the
+# result is clipped to "clip". Missing numeric values get no adjustment.
+# Rules are looked up with np.searchsorted over whole columns, so /predict and
+# /predict_batch share one code path, and a rule change is an edit to the
+# JSON file (picked up by the model registry) rather than a redeploy.
+
+import hashlib
+import json
+
+import numpy as np
+
+
+class OverrideTable:
+    """Declarative per-field probability adjustments."""
+
+    def __init__(self, rules, clip=(0.0, 1.0), version=""):
+        self.rules = []
+        for rule in rules:
+            field = rule["field"]
+            if "values" in rule:
+                self.rules.append((field, None, {str(k): float(v) for k, v in rule["values"].items()}))
+                continue
+            edges = np.asarray(rule["edges"], dtype=float)
+            deltas = np.asarray(rule["deltas"], dtype=float)
+            if len(deltas) != len(edges) + 1:
+                raise ValueError(f"{field}: need len(edges) + 1 deltas, got {len(deltas)} for {len(edges)} edges")
+            if np.any(np.diff(edges) <= 0) or not np.all(np.isfinite(edges)):
+                raise ValueError(f"{field}: edges must be finite and strictly increasing")
+            self.rules.append((field, edges, deltas))
+        self.clip = tuple(float(c) for c in clip)
+        self.version = version
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            raw = f.read()
+        config = json.loads(raw)
+        return cls(
+            config["rules"],
+            clip=config.get("clip", (0.0, 1.0)),
+            version=hashlib.sha256(raw).hexdigest()[:12],
+        )
+
+    def deltas(self, cols, n):
+        # one array of adjustments per rule, in file order
+        for field, edges, deltas in self.rules:
+            if edges is None:
+                values = np.asarray(cols[field], dtype=object)
+                adjust = np.zeros(n)
+                for value, delta in deltas.items():
+                    adjust[values == value] = delta
+                yield adjust
+            else:
+                x = np.asarray(cols[field], dtype=float)
+                # side="right": a value equal to an edge falls in the bin above
+                adjust = deltas[np.searchsorted(edges, x, side="right")]
+                # NaN sorts past the last edge; the old if/elif chains gave it 0
+                yield np.where(np.isnan(x), 0.0, adjust)
+
+    def breakdown(self, cols, n):
+        # {field: adjustment array} - which rules moved each probability
+        return {field: adjust for (field, _, _), adjust in zip(self.rules, self.deltas(cols, n))}
+
+    def apply(self, prob, cols):
+        prob = np.asarray(prob, dtype=float)
+        for adjust in self.deltas(cols, len(prob)):
+            prob = prob + adjust
+        return np.clip(prob, *self.clip)
@@ -0,0 +1,92 @@
+# prediction_cache.py
+#
+# In-process LRU + TTL cache of final probabilities (after overrides), keyed on
+# the canonicalized StrokeInput fields plus the model version. A hit skips
+# feature engineering and the model entirely.
+#
+# canonicalize() strips whitespace from strings and optionally rounds floats
+# to float_digits. Casing is kept as-is on purpose: the one-hot vocabularies
+# and the smoking override are case-sensitive, so "Smokes" and "smokes" really
+# do score differently. The API canonicalizes every record before scoring,
+# cache or no cache, so a key always maps to the exact input that produced
+# the cached value and turning the cache off never changes a score.
+
+import threading
+import time
+from collections import OrderedDict
+
+FIELDS = [
+    "gender", "age", "hypertension", "heart_disease", "ever_married",
+    "Residence_type", "avg_glucose_level", "bmi", "smoking_status", "work_type",
+]
+
+
+def canonicalize(record, float_digits=None):
+    canonical = {}
+    for name in FIELDS:
+        value = record[name]
+        if isinstance(value, str):
+            value = value.strip()
+        elif isinstance(value, float) and float_digits is not None:
+            value = round(value, float_digits)
+        canonical[name] = value
+    return canonical
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with per-entry TTL and hit/miss/eviction counters."""
+
+    def __init__(self, max_size=10_000, ttl=3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def key(self, canonical, model_version):
+        return (model_version,) + tuple(canonical[name] for name in FIELDS)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires = entry
+            if expires < now:
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
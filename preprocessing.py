@@ -1,3 +1,4 @@
+import json
 import pandas as pd
 import numpy as np
 import joblib
@@ -9,8 +10,15 @@ from xgboost import XGBClassifier
 from imblearn.over_sampling import SMOTE
 from imblearn.pipeline import Pipeline as ImbPipeline
 from sklearn.impute import SimpleImputer
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.utils.validation import check_is_fitted
 
-def feature_engineering(df):
+GLUCOSE_QUANTILES = [0.25, 0.5, 0.75]
+
+
+def feature_engineering(df, glucose_quantiles=None):
+    # glucose_quantiles: (q1, q2, q3) learned at fit time. If None they are
+    # taken from df itself, so results depend on which rows are passed in.
     df = df.copy()
     
     df['age_group'] = pd.cut(
@@ -28,7 +36,9 @@ def feature_engineering(df):
         duplicates="drop"
     )
 
-    q1, q2, q3 = df['avg_glucose_level'].quantile([0.25, 0.5, 0.75])
+    if glucose_quantiles is None:
+        glucose_quantiles = df['avg_glucose_level'].quantile(GLUCOSE_QUANTILES)
+    q1, q2, q3 = glucose_quantiles
     
     # Ensure uniqueness in glucose bins
     glucose_bins = sorted(set([-1, q1, q2, q3, np.inf]))
@@ -83,3 +93,50 @@ def feature_engineering(df):
     )
 
     return df
+
+
+class FeatureEngineer(BaseEstimator, TransformerMixin):
+    """Fitted version of feature_engineering.
+
+    The glucose quartiles are learned once in fit() and reused for every
+    transform, so scoring 1 row or 1M rows gives the same features.
+    """
+
+    def fit(self, X, y=None):
+        quantiles = X['avg_glucose_level'].quantile(GLUCOSE_QUANTILES)
+        self.glucose_quantiles_ = tuple(float(q) for q in quantiles)
+        return self
+
+    def transform(self, X):
+        check_is_fitted(self, "glucose_quantiles_")
+        return feature_engineering(X, glucose_quantiles=self.glucose_quantiles_)
+
+
+def upgrade_legacy_pipeline(pipe, meta):
+    """Pipelines saved before FeatureEngineer existed have a
+    FunctionTransformer(feature_engineering) step, which takes the glucose
+    quartiles from whatever batch it is given. Swap it (in place) for a
+    FeatureEngineer holding the training quartiles from meta["glucose_quantiles"].
+    """
+    fe = pipe.named_steps["feature_engineering"]
+    if hasattr(fe, "glucose_quantiles_"):
+        return pipe
+    quantiles = meta.get("glucose_quantiles")
+    if quantiles is None:
+        raise ValueError(
+            "Legacy pipeline: feature_engineering has no fitted glucose quartiles and the model "
+            "metadata has no glucose_quantiles; retrain with train_pipeline.py."
+        )
+    upgraded = FeatureEngineer()
+    upgraded.glucose_quantiles_ = tuple(float(q) for q in quantiles)
+    names = [name for name, _ in pipe.steps]
+    pipe.steps[names.index("feature_engineering")] = ("feature_engineering", upgraded)
+    return pipe
+
+
+def load_pipeline(model_path, meta_path="model_meta.json"):
+    """joblib.load + upgrade_legacy_pipeline() with the quartiles from meta_path."""
+    pipe = joblib.load(model_path)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return upgrade_legacy_pipeline(pipe, meta)
@@ -0,0 +1,99 @@
+# request_log.py
+#
+# Background JSONL request/response log for audits and drift analysis.
+# log() only does a sampling check and a non-blocking queue put; JSON encoding,
+# batching, file writes and size-based rotation all happen on a writer thread.
+# If the queue is full the record is dropped (and counted) rather than making
+# a prediction wait. Failed writes are counted too (write_failures, records
+# lost in failed_records) and reported through the logging module.
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLogger:
+    """Buffered, rotating JSONL logger fed from the request path."""
+
+    def __init__(self, path, max_bytes=50_000_000, backups=5, sample_rate=1.0,
+                 batch_size=256, flush_interval=1.0, queue_size=10_000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self.write_failures = 0
+        self.failed_records = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-log", daemon=True)
+        self._thread.start()
+
+    def log(self, endpoint, request, response):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait((time.time(), endpoint, request, response))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=5.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    # ---------- writer thread ----------
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception:
+                    # never let a logging failure kill the writer thread
+                    self.write_failures += 1
+                    self.failed_records += len(batch)
+                    logger.exception("request log write to %s failed, %d records lost", self.path, len(batch))
+
+    def _write(self, batch):
+        lines = "".join(
+            json.dumps({"ts": ts, "endpoint": endpoint, "request": request, "response": response},
+                       default=str) + "\n"
+            for ts, endpoint, request, response in batch
+        )
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path) and os.path.getsize(self.path) + len(lines) > self.max_bytes:
+            self._rotate()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        self.written += len(batch)
+
+    def _rotate(self):
+        # requests.jsonl -> requests.jsonl.1 -> ... -> requests.jsonl.<backups>
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
@@ -0,0 +1,279 @@
+# score_file.py
+#
+# Bulk-score a CSV or Parquet file in the stroke_data.csv schema without
+# loading it into memory. The input is read in chunks, chunks are scored in a
+# process pool (same model + overrides as the API) and results are written in
+# input order as they finish, so memory stays at ~workers x chunk size.
+#
+#   python score_file.py extract.csv scored.csv
+#   python score_file.py extract.parquet scored.parquet --workers 8     # directory of Parquet part files
+#   python score_file.py extract.csv scored/ --format parquet           # any name with --format
+#   python score_file.py extract.csv scored.csv --resume                # continue after a crash
+#
+# Progress is checkpointed to <output>.progress.json after every chunk
+# (CSV: input byte offset + output size; Parquet: row group + part files), so
+# --resume skips everything already written and truncates a half-written tail
+# (or starts over if the output has gone missing since).
+# CSV inputs are split on newlines, so quoted fields must not contain line
+# breaks (true for the stroke schema).
+
+import argparse
+import importlib.util
+import io
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from model_registry import load_export, load_model
+
+# ---------- CONFIG ----------
+MODEL_PATH = "xgb_pipe.joblib"
+META_PATH = "model_meta.json"
+KERNEL_PATH = "xgb_kernel.npz"
+OVERRIDES_PATH = "overrides.json"
+CHUNK_ROWS = 100_000            # rows per chunk (CSV) - Parquet uses its row groups
+KEEP_COLUMNS = ["id"]           # input columns copied to the output when present
+MEDIUM_RISK = 0.15              # same labels as main.format_prediction
+# -----------------------------
+
+_loaded = None   # per-process model, set by _init_worker
+
+
+def _init_worker(export_dir, threads=None):
+    # pool workers get threads=1: the processes are the parallelism, and N
+    # workers each running XGBoost on every core would mean N x N threads
+    global _loaded
+    if threads:
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+    if export_dir:
+        _loaded = load_export(export_dir, META_PATH, OVERRIDES_PATH)
+    else:
+        _loaded = load_model(MODEL_PATH, META_PATH, KERNEL_PATH, OVERRIDES_PATH)
+    if threads and _loaded.pipeline is not None:
+        _loaded.pipeline.steps[-1][1].set_params(n_jobs=threads)    # -> booster nthread
+
+
+def score_frame(df, loaded):
+    cols = {name: df[name].to_numpy() for name in df.columns}
+    if loaded.kernel is not None:
+        probs = loaded.kernel.predict_proba(cols)[:, 1]
+    elif loaded.fast_features is not None:
+        probs = loaded.pipeline.steps[-1][1].predict_proba(loaded.fast_features.transform(cols))[:, 1]
+    else:
+        probs = loaded.pipeline.predict_proba(df)[:, 1]
+    probs = loaded.overrides.apply(probs, cols)
+
+    out = df[[c for c in KEEP_COLUMNS if c in df.columns]].copy()
+    out["probability"] = probs
+    out["risk_level"] = np.where(
+        probs >= loaded.threshold, "HIGH", np.where(probs >= MEDIUM_RISK, "MEDIUM", "LOW")
+    )
+    out["model_version"] = loaded.version
+    return out
+
+
+def read_chunk(task):
+    kind, source, part = task
+    if kind == "csv":
+        header, block = source, part
+        return pd.read_csv(io.BytesIO(header + block))
+    import pyarrow.parquet as pq
+
+    return pq.ParquetFile(source).read_row_group(part).to_pandas()
+
+
+def _score_chunk(task, part_path, with_header):
+    # runs in a pool worker: parse, score and encode the chunk, so the parent
+    # only moves bytes. Parquet parts are written here and swapped in whole.
+    df = read_chunk(task)
+    out = score_frame(df, _loaded)
+    if part_path is None:
+        return len(df), out.to_csv(index=False, header=with_header).encode()
+    tmp = part_path + ".tmp"
+    out.to_parquet(tmp, index=False)
+    os.replace(tmp, part_path)
+    return len(df), None
+
+
+# ---------- input chunking ----------
+def csv_chunks(path, offset, chunk_rows):
+    # yields (header, block of whole lines, offset after the block)
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(max(offset, len(header)))
+        while True:
+            # size hint in bytes (~64 per stroke_data.csv row); always whole lines
+            lines = f.readlines(chunk_rows * 64)
+            if not lines:
+                return
+            yield header, b"".join(lines), f.tell()
+
+
+def _check_parquet():
+    if importlib.util.find_spec("pyarrow") is None:
+        raise SystemExit("❌ Parquet needs pyarrow (pip install pyarrow)")
+
+
+# ---------- checkpointing ----------
+def input_fingerprint(path):
+    st = os.stat(path)
+    return {"input": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def load_progress(progress_path, fingerprint, model_version):
+    if not os.path.exists(progress_path):
+        return None
+    with open(progress_path) as f:
+        progress = json.load(f)
+    if progress["fingerprint"] != fingerprint:
+        raise SystemExit("❌ Input file changed since the last run; rerun without --resume")
+    if progress["model_version"] != model_version:
+        raise SystemExit(
+            f"❌ Model changed since the last run ({progress['model_version']} -> {model_version}); "
+            "rerun without --resume"
+        )
+    return progress
+
+
+def output_intact(output, progress, parquet_out):
+    # everything the checkpoint says was written is still there
+    if parquet_out:
+        return all(os.path.exists(os.path.join(output, f"part-{i:05d}.parquet")) for i in range(progress["chunks"]))
+    return os.path.exists(output) and os.path.getsize(output) >= progress["output_bytes"]
+
+
+def output_format(output, fmt):
+    if fmt:
+        return fmt
+    for ext, name in [(".csv", "csv"), (".parquet", "parquet")]:
+        if output.rstrip("/").endswith(ext):
+            return name
+    raise SystemExit(f"❌ Can't tell the output format from {output!r}: use a .csv / .parquet name or --format")
+
+
+def save_progress(progress_path, progress):
+    tmp = progress_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(progress, f)
+    os.replace(tmp, progress_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream-score a CSV/Parquet file with the stroke model")
+    parser.add_argument("input", help=".csv or .parquet in the stroke_data.csv schema")
+    parser.add_argument("output", help=".csv file, or a .parquet directory for Parquet part files")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None,
+                        help="output format (default: from the output's .csv / .parquet extension)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--export-dir", default="", help="score with a compile_model.py --export-dir export")
+    parser.add_argument("--resume", action="store_true", help="continue from <output>.progress.json")
+    args = parser.parse_args()
+
+    parquet_in = args.input.endswith(".parquet")
+    parquet_out = output_format(args.output, args.format) == "parquet"
+    if parquet_in or parquet_out:
+        _check_parquet()
+
+    # the parent loads the model too: version for the checkpoint + fail fast
+    _init_worker(args.export_dir)
+    model_version = _loaded.version
+    progress_path = args.output.rstrip("/") + ".progress.json"
+    fingerprint = input_fingerprint(args.input)
+
+    progress = load_progress(progress_path, fingerprint, model_version) if args.resume else None
+    if progress is not None and not output_intact(args.output, progress, parquet_out):
+        print(f"⚠️ {args.output} is missing or shorter than the checkpoint; starting over")
+        progress = None
+    if progress is None:
+        progress = {"fingerprint": fingerprint, "model_version": model_version,
+                    "position": 0, "chunks": 0, "rows": 0, "output_bytes": 0}
+    elif progress.get("done"):
+        print(f"✅ {args.output} is already complete ({progress['rows']} rows)")
+        return
+    else:
+        print(f"↩️ Resuming after {progress['chunks']} chunks / {progress['rows']} rows")
+
+    # drop anything written after the last checkpoint
+    if parquet_out:
+        os.makedirs(args.output, exist_ok=True)
+        for name in os.listdir(args.output):
+            if name.startswith("part-") and int(name[5:10]) >= progress["chunks"]:
+                os.remove(os.path.join(args.output, name))
+        out_file = None
+    else:
+        out_file = open(args.output, "r+b" if progress["chunks"] else "wb")
+        out_file.truncate(progress["output_bytes"])
+        out_file.seek(progress["output_bytes"])
+
+    # (task, position after this chunk); position = byte offset / row group
+    if parquet_in:
+        import pyarrow.parquet as pq
+
+        n_groups = pq.ParquetFile(args.input).num_row_groups
+        tasks = (
+            (("parquet", args.input, group), group + 1)
+            for group in range(progress["position"], n_groups)
+        )
+    else:
+        tasks = (
+            (("csv", header, block), end)
+            for header, block, end in csv_chunks(args.input, progress["position"], args.chunk_rows)
+        )
+
+    start = time.perf_counter()
+    rows_this_run = 0
+    next_chunk = progress["chunks"]
+    with ProcessPoolExecutor(
+        max_workers=args.workers, initializer=_init_worker, initargs=(args.export_dir, 1)
+    ) as pool:
+        # at most 2 chunks per worker in flight: bounded memory, results in order
+        in_flight = deque()
+        for task, end in tasks:
+            part = os.path.join(args.output, f"part-{next_chunk:05d}.parquet") if parquet_out else None
+            in_flight.append((pool.submit(_score_chunk, task, part, next_chunk == 0), end))
+            next_chunk += 1
+            if len(in_flight) >= 2 * args.workers:
+                rows_this_run += _finish(in_flight.popleft(), out_file, progress, progress_path)
+                _report(progress, rows_this_run, start)
+        while in_flight:
+            rows_this_run += _finish(in_flight.popleft(), out_file, progress, progress_path)
+            _report(progress, rows_this_run, start)
+
+    progress["done"] = True
+    save_progress(progress_path, progress)
+    if out_file is not None:
+        out_file.close()
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ Scored {rows_this_run} rows in {elapsed:.1f}s "
+          f"({rows_this_run / max(elapsed, 1e-9):,.0f} rows/sec) -> {args.output}")
+
+
+def _finish(item, out_file, progress, progress_path):
+    future, end = item
+    rows, data = future.result()
+    if out_file is not None:
+        out_file.write(data)
+        out_file.flush()
+        os.fsync(out_file.fileno())
+        progress["output_bytes"] = out_file.tell()
+    progress["position"] = end
+    progress["chunks"] += 1
+    progress["rows"] += rows
+    save_progress(progress_path, progress)
+    return rows
+
+
+def _report(progress, rows_this_run, start):
+    elapsed = time.perf_counter() - start
+    print(f"\r{progress['chunks']} chunks, {progress['rows']:,} rows "
+          f"({rows_this_run / max(elapsed, 1e-9):,.0f} rows/sec)", end="", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,124 +1,245 @@
 # shap_report.py
-import joblib
-import pandas as pd
+#
+# SHAP values for the whole dataset, computed once and cached:
+#
+#   python shap_report.py                # load reports/shap_cache/ (or build it) + plots
+#   python shap_report.py --recompute    # ignore the cache
+#   python shap_report.py --workers 4 --chunk-rows 2000
+#
+# Rows go through feature_engineering + preprocessing into a memory-mapped
+# features.npy, then worker processes run TreeExplainer on chunks of it and
+# write their rows of shap_values.npy in place. meta.json records the
+# one-hot feature names (from the fitted ColumnTransformer), the expected
+# value and the sha256 of xgb_pipe.joblib, the data file and the glucose
+# quartiles in model_meta.json (legacy pipelines are transformed with them);
+# the cache is rebuilt whenever one changes. Other scripts can use
+# load_shap_cache().
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import shap
 import matplotlib.pyplot as plt
 from pathlib import Path
 from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
+
+from compile_model import file_sha256
+from dataset import read_dataset
+from preprocessing import load_pipeline
 
 # ---------- CONFIG ----------
 MODEL_PATH = "xgb_pipe.joblib"      # your trained pipeline
+META_PATH = "model_meta.json"       # glucose quartiles for pipelines saved before FeatureEngineer
 DATA_PATH = "stroke_data.csv"       # your original dataset
 OUTPUT_DIR = Path("reports")        # where plots will be saved
-MAX_BACKGROUND = 500                # rows to use for SHAP background
+CACHE_DIR = OUTPUT_DIR / "shap_cache"
+CHUNK_ROWS = 1000                   # rows per SHAP task
+PLOT_ROWS = 5000                    # rows drawn in the summary plot (all values are cached)
 TARGET_COLS = ["stroke", "target", "label"]  # possible target names
 # -----------------------------
 
-OUTPUT_DIR.mkdir(exist_ok=True)
-
-print("Loading model...")
-model = joblib.load(MODEL_PATH)
-
-print("Loaded model type:", type(model))
-
-if not (isinstance(model, Pipeline) or hasattr(model, "steps")):
-    raise RuntimeError(
-        "Loaded model is not a sklearn/imbalanced-learn Pipeline. "
-        "This script assumes a Pipeline with a ColumnTransformer and a tree-based final model."
-    )
-
-print("\nPipeline steps:")
-for name, step in model.steps:
-    print(f" - {name}: {type(step)}")
-
-print("\nLoading data...")
-df = pd.read_csv(DATA_PATH)
-
-# Drop target column if present
-for col in TARGET_COLS:
-    if col in df.columns:
-        print(f"Dropping target column: {col}")
-        df = df.drop(columns=[col])
-        break
-
-# Sample background data
-X_raw = df.sample(min(len(df), MAX_BACKGROUND), random_state=42)
-print(f"Using {X_raw.shape[0]} rows and {X_raw.shape[1]} raw features for background")
-
-# ---------- Find the preprocessor (ColumnTransformer) and final model ----------
-preprocessor = None
-for name, step in model.steps:
-    if isinstance(step, ColumnTransformer):
-        preprocessor = step
-        print(f"\nDetected ColumnTransformer as preprocessor: step '{name}'")
-        break
-
-if preprocessor is None:
-    # Fallback: first step that has a transform method
-    for name, step in model.steps:
-        if hasattr(step, "transform"):
-            preprocessor = step
-            print(f"\nNo ColumnTransformer found; using first transform-capable step: '{name}'")
-            break
-
-if preprocessor is None:
-    raise RuntimeError(
-        "Could not find a preprocessing step with .transform() in the pipeline."
+_explainer = None   # per-worker TreeExplainer, set by _init_worker
+
+
+def feature_names_from(model, n_features):
+    # "num__age", "cat__smoking_status_smokes", ... from the fitted ColumnTransformer
+    try:
+        names = list(model.named_steps["preprocessing"].get_feature_names_out())
+    except Exception as e:
+        print(f"⚠️ Could not recover feature names ({e}); using feature_<i>")
+        return [f"feature_{i}" for i in range(n_features)]
+    return names if len(names) == n_features else [f"feature_{i}" for i in range(n_features)]
+
+
+def quantiles_sha256(model_meta_path=META_PATH):
+    # the part of model_meta.json that changes the features (via load_pipeline)
+    try:
+        with open(model_meta_path) as f:
+            quantiles = json.load(f).get("glucose_quantiles")
+    except FileNotFoundError:
+        quantiles = None
+    return hashlib.sha256(json.dumps(quantiles).encode()).hexdigest()
+
+
+def load_shap_cache(cache_dir=CACHE_DIR, model_path=MODEL_PATH, data_path=DATA_PATH,
+                    model_meta_path=META_PATH):
+    """(shap_values, features, meta) memory-mapped, or None if missing/stale."""
+    meta_path = Path(cache_dir) / "meta.json"
+    if not meta_path.exists():
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if not meta.get("complete") or meta["model_sha256"] != file_sha256(model_path) \
+            or meta["data_sha256"] != file_sha256(data_path) \
+            or meta.get("quantiles_sha256") != quantiles_sha256(model_meta_path):
+        return None
+    values = np.load(Path(cache_dir) / "shap_values.npy", mmap_mode="r")
+    features = np.load(Path(cache_dir) / "features.npy", mmap_mode="r")
+    return values, features, meta
+
+
+def _init_worker(estimator):
+    global _explainer
+    _explainer = shap.TreeExplainer(estimator)
+
+
+def _shap_chunk(cache_dir, start, stop):
+    features = np.load(Path(cache_dir) / "features.npy", mmap_mode="r")
+    out = np.load(Path(cache_dir) / "shap_values.npy", mmap_mode="r+")
+    values = _explainer.shap_values(np.asarray(features[start:stop]))
+    if isinstance(values, list):    # older shap: one array per class
+        values = values[-1]
+    out[start:stop] = values
+    out.flush()
+    return stop - start
+
+
+def build_shap_cache(model, X_raw, cache_dir, model_sha, data_sha, quantiles_sha,
+                     workers=None, chunk_rows=CHUNK_ROWS):
+    if len(X_raw) == 0:
+        raise ValueError("No rows to explain - the data file is empty")
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    meta_path = cache_dir / "meta.json"
+    if meta_path.exists():
+        meta_path.unlink()     # incomplete until the end
+
+    # ---------- Transform data (chunked, straight into a memmap) ----------
+    print("\nTransforming data through feature engineering + preprocessing...")
+    fe = model.named_steps["feature_engineering"]
+    pre = model.named_steps["preprocessing"]
+    features = None
+    for start in range(0, len(X_raw), chunk_rows):
+        X_trans = pre.transform(fe.transform(X_raw.iloc[start:start + chunk_rows]))
+        X_trans = X_trans.toarray() if hasattr(X_trans, "toarray") else np.asarray(X_trans)
+        if features is None:
+            features = np.lib.format.open_memmap(
+                cache_dir / "features.npy", mode="w+", dtype=np.float32,
+                shape=(len(X_raw), X_trans.shape[1]),
+            )
+        features[start:start + len(X_trans)] = X_trans
+    features.flush()
+    n_rows, n_features = features.shape
+    print(f"Transformed data shape: {features.shape}")
+
+    values = np.lib.format.open_memmap(
+        cache_dir / "shap_values.npy", mode="w+", dtype=np.float32, shape=(n_rows, n_features)
     )
-
-# final model = last step (e.g., XGBClassifier)
-final_step_name, final_model = model.steps[-1]
-print(f"Detected final model step '{final_step_name}': {type(final_model)}")
-
-# ---------- Transform data ----------
-print("\nTransforming data through preprocessor...")
-print("\nTransforming data through full pipeline (including feature engineering + SMOTE-safe path)…")
-X_trans = model.named_steps["preprocessing"].transform(
-    model.named_steps["feature_engineering"].transform(X_raw)
-)
-
-# Convert to dense array if sparse
-if hasattr(X_trans, "toarray"):
-    X_dense = X_trans.toarray()
-else:
-    X_dense = np.asarray(X_trans)
-
-n_features = X_dense.shape[1]
-print(f"Transformed data shape: {X_dense.shape}")
-
-# Use generic feature names (we don't have the expanded one-hot names here)
-feature_names = [f"feature_{i}" for i in range(n_features)]
-
-# ---------- Build SHAP TreeExplainer on the final model ----------
-print("\nBuilding SHAP TreeExplainer...")
-explainer = shap.TreeExplainer(final_model)
-
-print("Computing SHAP values (this may take a bit)...")
-shap_values = explainer(X_dense)  # for binary classification: (n_samples, n_features)
-
-# ---------- SUMMARY PLOT ----------
-print("\nSaving SHAP summary plot...")
-plt.figure(figsize=(8, 6))
-shap.summary_plot(shap_values, X_dense, feature_names=feature_names, show=False)
-plt.tight_layout()
-summary_path = OUTPUT_DIR / "shap_summary.png"
-plt.savefig(summary_path, dpi=200)
-plt.close()
-
-# ---------- FORCE PLOT FOR ONE EXAMPLE ----------
-print("Saving SHAP force plot for one example...")
-row_idx = 0
-shap_row = shap_values[row_idx]
-x_row = X_dense[row_idx]
-
-shap.plots.force(shap_row, x_row, feature_names=feature_names, matplotlib=True, show=False)
-plt.tight_layout()
-force_path = OUTPUT_DIR / "shap_force_example_0.png"
-plt.savefig(force_path, dpi=200)
-plt.close()
-
-print("\nDone!")
-print(f"Summary plot: {summary_path}")
-print(f"Force plot:   {force_path}")
+    del values   # workers open it themselves
+
+    # ---------- SHAP values, chunked across processes ----------
+    workers = workers or os.cpu_count()
+    bounds = [(s, min(s + chunk_rows, n_rows)) for s in range(0, n_rows, chunk_rows)]
+    print(f"Computing SHAP values: {n_rows} rows in {len(bounds)} chunks on {workers} workers...")
+    start_time = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model.steps[-1][1],)) as pool:
+        futures = [pool.submit(_shap_chunk, str(cache_dir), a, b) for a, b in bounds]
+        for future in futures:
+            done += future.result()
+            print(f"\r  {done}/{n_rows} rows", end="", flush=True)
+    elapsed = time.perf_counter() - start_time
+    print(f"\n  done in {elapsed:.1f}s ({n_rows / elapsed:,.0f} rows/sec)")
+
+    # bias term of XGBoost's own TreeSHAP (the last pred_contribs column);
+    # some shap/xgboost version pairs report expected_value without base_score
+    import xgboost as xgb
+
+    booster = model.steps[-1][1].get_booster()
+    expected_value = booster.predict(xgb.DMatrix(np.asarray(features[:1])), pred_contribs=True)[0, -1]
+    meta = {
+        "model_sha256": model_sha,
+        "data_sha256": data_sha,
+        "quantiles_sha256": quantiles_sha,
+        "n_rows": n_rows,
+        "feature_names": feature_names_from(model, n_features),
+        "expected_value": float(expected_value),
+        "seconds": elapsed,
+        "complete": True,
+    }
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    return load_shap_cache(cache_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cached, parallel SHAP values + plots for xgb_pipe.joblib")
+    parser.add_argument("--recompute", action="store_true", help="ignore the cache")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    OUTPUT_DIR.mkdir(exist_ok=True)
+
+    cached = None if args.recompute else load_shap_cache()
+    if cached is not None:
+        print(f"♻️ Using cached SHAP values from {CACHE_DIR}/ (model, data + quartiles unchanged)")
+    else:
+        print("Loading model...")
+        model = load_pipeline(MODEL_PATH, META_PATH)
+
+        print("Loaded model type:", type(model))
+
+        if not (isinstance(model, Pipeline) or hasattr(model, "steps")):
+            raise RuntimeError(
+                "Loaded model is not a sklearn/imbalanced-learn Pipeline. "
+                "This script assumes a Pipeline with a ColumnTransformer and a tree-based final model."
+            )
+
+        print("\nPipeline steps:")
+        for name, step in model.steps:
+            print(f" - {name}: {type(step)}")
+
+        print("\nLoading data...")
+        df = read_dataset(DATA_PATH)
+
+        # Drop target column if present
+        for col in TARGET_COLS:
+            if col in df.columns:
+                print(f"Dropping target column: {col}")
+                df = df.drop(columns=[col])
+                break
+
+        cached = build_shap_cache(
+            model, df, CACHE_DIR, file_sha256(MODEL_PATH), file_sha256(DATA_PATH), quantiles_sha256(),
+            workers=args.workers, chunk_rows=args.chunk_rows,
+        )
+
+    shap_values, X_dense, meta = cached
+    feature_names = meta["feature_names"]
+
+    # ---------- SUMMARY PLOT ----------
+    print("\nSaving SHAP summary plot...")
+    rows = np.random.default_rng(42).permutation(len(X_dense))[:PLOT_ROWS]
+    rows.sort()
+    plt.figure(figsize=(8, 6))
+    shap.summary_plot(np.asarray(shap_values[rows]), np.asarray(X_dense[rows]),
+                      feature_names=feature_names, show=False)
+    plt.tight_layout()
+    summary_path = OUTPUT_DIR / "shap_summary.png"
+    plt.savefig(summary_path, dpi=200)
+    plt.close()
+
+    # ---------- FORCE PLOT FOR ONE EXAMPLE ----------
+    print("Saving SHAP force plot for one example...")
+    row_idx = 0
+    shap.plots.force(meta["expected_value"], np.asarray(shap_values[row_idx]), np.asarray(X_dense[row_idx]),
+                     feature_names=feature_names, matplotlib=True, show=False)
+    plt.tight_layout()
+    force_path = OUTPUT_DIR / "shap_force_example_0.png"
+    plt.savefig(force_path, dpi=200)
+    plt.close()
+
+    print("\nDone!")
+    print(f"Summary plot: {summary_path}")
+    print(f"Force plot:   {force_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# stage_cache.py
+#
+# On-disk cache for the expensive training stages (load + recode the CSV,
+# FeatureEngineer, ColumnTransformer, SMOTE), like sklearn's Pipeline(memory=)
+# but aware of imblearn samplers: a SMOTE step caches its resampled (X, y).
+#
+# Each stage's key chains the key of its input with the step class, its
+# params (as canonical JSON, see canonical_params) and a code version - the source hash for classes defined in this
+# repo (FeatureEngineer -> preprocessing.py), the library version otherwise.
+# Changing only XGBoost params therefore reuses every preprocessing stage,
+# while editing preprocessing.py or the data invalidates them.
+#
+# Entries are evicted least-recently-used once the cache exceeds max_bytes.
+#
+#   python stage_cache.py            # entries + cumulative time saved
+#   python stage_cache.py --clear
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import joblib
+
+from compile_model import file_sha256
+
+# ---------- CONFIG ----------
+CACHE_DIR = ".stage_cache"
+MAX_BYTES = 2_000_000_000       # evict least-recently-used entries past ~2 GB
+# -----------------------------
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_key(*parts):
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:24]
+
+
+def canonical_params(value):
+    # estimators -> class + their own params, recursively; their repr drops
+    # default params and gets truncated for long pipelines, so it can't be a key
+    if hasattr(value, "get_params") and not isinstance(value, type):
+        cls = type(value)
+        return {"class": f"{cls.__module__}.{cls.__qualname__}",
+                "params": canonical_params(value.get_params(deep=False))}
+    if isinstance(value, dict):
+        return {str(k): canonical_params(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical_params(v) for v in value]
+    if callable(value) and hasattr(value, "__qualname__"):
+        return f"{value.__module__}.{value.__qualname__}"
+    return value
+
+
+def code_version(obj):
+    # source hash for repo code, package version for library classes
+    module = sys.modules[type(obj).__module__]
+    path = getattr(module, "__file__", None)
+    if path and os.path.abspath(path).startswith(REPO_DIR + os.sep):
+        return file_sha256(path)
+    package = sys.modules[type(obj).__module__.split(".")[0]]
+    return getattr(package, "__version__", "")
+
+
+class StageCache:
+    """Stores stage outputs with joblib; counts hits and the compute time they saved."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".joblib", base + ".json"
+
+    def get_or_compute(self, stage, key, fn):
+        data_path, info_path = self._paths(key)
+        if os.path.exists(data_path) and os.path.exists(info_path):
+            start = time.perf_counter()
+            try:
+                value = joblib.load(data_path)
+                with open(info_path) as f:
+                    info = json.load(f)
+            except Exception as e:
+                print(f"⚠️ stage cache entry {key} unreadable ({e}); recomputing")
+            else:
+                saved = info["compute_seconds"] - (time.perf_counter() - start)
+                self.hits += 1
+                self.seconds_saved += saved
+                os.utime(data_path)    # LRU order
+                self._record(saved)
+                print(f"   ♻️ {stage}: cached ({info['compute_seconds']:.2f}s saved)")
+                return value
+
+        start = time.perf_counter()
+        value = fn()
+        compute_seconds = time.perf_counter() - start
+        self.misses += 1
+
+        tmp = f"{data_path}.tmp-{os.getpid()}"
+        joblib.dump(value, tmp)
+        os.replace(tmp, data_path)
+        with open(info_path, "w") as f:
+            json.dump({"stage": stage, "compute_seconds": compute_seconds, "created": time.time()}, f)
+        print(f"   ⚙️ {stage}: computed in {compute_seconds:.2f}s")
+        self.evict()
+        return value
+
+    def entries(self):
+        out = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".joblib"):
+                path = os.path.join(self.cache_dir, name)
+                st = os.stat(path)
+                out.append((st.st_mtime, st.st_size, name[: -len(".joblib")]))
+        return sorted(out)
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                if os.path.exists(path):
+                    os.remove(path)
+            total -= size
+
+    def clear(self):
+        for _, _, key in self.entries():
+            for path in self._paths(key):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _record(self, saved):
+        # cumulative totals across runs, for `python stage_cache.py`
+        path = os.path.join(self.cache_dir, "stats.json")
+        stats = {"hits": 0, "seconds_saved": 0.0}
+        if os.path.exists(path):
+            with open(path) as f:
+                stats = json.load(f)
+        stats["hits"] += 1
+        stats["seconds_saved"] += saved
+        with open(path, "w") as f:
+            json.dump(stats, f)
+
+    def summary(self):
+        return (f"stage cache: {self.hits} hits, {self.misses} misses, "
+                f"{self.seconds_saved:.2f}s saved")
+
+
+def fit_steps_cached(pipe, X, y, data_key, cache):
+    """Fits every step of an (imblearn) pipeline except the last through the
+    cache and returns the final estimator's training data (X, y).
+
+    Fitted steps are swapped into `pipe` in place, so afterwards only
+    pipe.steps[-1] still needs fitting.
+    """
+    key = data_key
+    for i, (name, step) in enumerate(pipe.steps[:-1]):
+        key = make_key(key, name, canonical_params(step), code_version(step))
+        if hasattr(step, "fit_resample"):
+            # samplers only change the training data; nothing to keep but (X, y)
+            X, y = cache.get_or_compute(name, key, lambda: step.fit_resample(X, y))
+        else:
+            step, X = cache.get_or_compute(name, key, lambda: (step, step.fit_transform(X, y)))
+            pipe.steps[i] = (name, step)
+    return X, y
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the training stage cache")
+    parser.add_argument("--clear", action="store_true")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    cache = StageCache(args.cache_dir)
+    if args.clear:
+        cache.clear()
+        print(f"🧹 Cleared {args.cache_dir}/")
+        return
+
+    total = 0
+    for mtime, size, key in reversed(cache.entries()):
+        with open(cache._paths(key)[1]) as f:
+            info = json.load(f)
+        total += size
+        print(f"{key}  {info['stage']:20s}{size / 1e6:>9.1f} MB{info['compute_seconds']:>8.2f}s  "
+              f"last used {time.strftime('%Y-%m-%d %H:%M', time.localtime(mtime))}")
+    stats_path = os.path.join(args.cache_dir, "stats.json")
+    stats = {"hits": 0, "seconds_saved": 0.0}
+    if os.path.exists(stats_path):
+        with open(stats_path) as f:
+            stats = json.load(f)
+    print(f"\n{total / 1e6:.1f} MB of {cache.max_bytes / 1e6:.0f} MB used; "
+          f"{stats['hits']} hits have saved {stats['seconds_saved']:.1f}s so far")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,69 @@
+import os
 import streamlit as st
 import requests
 import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ------------------- SETTINGS -------------------
+API_URL = os.getenv("API_URL", "https://stroke-detection-ml.onrender.com").rstrip("/")
+# "api" = POST to API_URL/predict, "local" = load the pipeline in this process
+# (same response as the API, no network hop)
+SCORING_MODE = os.getenv("SCORING_MODE", "api")
+REQUEST_TIMEOUT = (5, float(os.getenv("API_TIMEOUT", "60")))   # (connect, read) seconds; Render cold starts are slow
+API_RETRIES = int(os.getenv("API_RETRIES", "2"))               # on connection errors / 502 / 503 / 504
+
+
+@st.cache_resource
+def get_session():
+    # One pooled keep-alive session per server process: repeat predictions
+    # reuse the TLS connection instead of a new handshake each click.
+    # Retries only when the request never reached the app (connect errors) or
+    # the proxy answered 502/503/504. read=0: a read timeout means the API may
+    # still be scoring (and logging) it, so it is not sent again.
+    retry = Retry(
+        total=API_RETRIES,
+        connect=API_RETRIES,
+        # total is only the overall cap: read=0 / other=0 are deliberate, so a
+        # POST /predict that timed out or broke mid-response is never resent
+        read=0,
+        other=0,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"}),
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(max_retries=retry, pool_maxsize=10))
+    session.mount("http://", HTTPAdapter(max_retries=retry, pool_maxsize=10))
+    return session
+
+
+@st.cache_resource
+def get_local_api():
+    # the API module itself, so local mode scores and formats exactly like /predict
+    os.environ.setdefault("REQUEST_LOG_PATH", "")
+    os.environ.setdefault("MODEL_POLL_SECONDS", "0")
+    import main
+    return main
+
+
+def predict_risk(payload):
+    """Same JSON as POST /predict: from the API, or scored in-process.
+    None if the API answered with an error status."""
+    if SCORING_MODE == "local":
+        api = get_local_api()
+        active = api.registry.current
+        try:
+            # canonicalized like /predict does it, so both modes score the same input
+            records = api.canonical_records([payload])
+            return api.format_prediction(api.score_records(records, active)[0], active)
+        except Exception as e:
+            return {"error": str(e), "model_version": active.version}
+
+    response = get_session().post(f"{API_URL}/predict", json=payload, timeout=REQUEST_TIMEOUT)
+    return response.json() if response.status_code == 200 else None
+
 
 # ------------------- PAGE CONFIG -------------------
 st.set_page_config(
@@ -182,7 +245,7 @@ if page.startswith("🏠"):
         st.markdown('<div id="results"></div>', unsafe_allow_html=True)
 
         with st.spinner("⏳ Predicting..."):
-            start = time.time()
+            start = time.perf_counter()
             payload = {
                 "age": age,
                 "hypertension": hypertension,
@@ -197,11 +260,10 @@ if page.startswith("🏠"):
             }
 
             try:
-                response = requests.post("https://stroke-detection-ml.onrender.com/predict", json=payload)
-                latency = round((time.time() - start) * 1000)
+                result = predict_risk(payload)
+                latency = round((time.perf_counter() - start) * 1000)
 
-                if response.status_code == 200:
-                    result = response.json()
+                if result is not None:
                     if "error" in result:
                         st.error(f"🚨 Server error: {result['error']}")
                     else:
@@ -235,7 +297,7 @@ if page.startswith("🏠"):
                                 </div>
                             """, unsafe_allow_html=True)
 
-                        st.markdown(f"⏱️ **Prediction latency:** `{latency}` ms")
+                        st.markdown(f"⏱️ **Prediction latency:** `{latency}` ms ({SCORING_MODE})")
                         st.markdown('<script>document.getElementById("results").scrollIntoView({behavior: "smooth"});</script>', unsafe_allow_html=True)
                 else:
                     st.markdown("""
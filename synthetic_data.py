@@ -0,0 +1,109 @@
+# synthetic_data.py
+#
+# Schema-identical synthetic versions of stroke_data.csv at any size, for
+# scale testing (see bench_training.py). It is a smoothed, class-stratified
+# bootstrap:
+#
+#   - exactly round(n * stroke rate) positive rows, so the imbalance is kept
+#   - each row is a real row of the same class, so category frequencies,
+#     correlations and the (class-dependent) missing-bmi rate carry over
+#   - age / avg_glucose_level / bmi get a little noise, so rows aren't
+#     copies and the numeric marginals stay smooth; "N/A" bmi stays missing
+#   - ids are new and unique
+#
+# Rows are generated and written in chunks, so 10M rows need little memory.
+#
+#   python synthetic_data.py 1000000                     # -> synthetic/stroke_1000000.csv
+#   python synthetic_data.py 10000000 --convert          # + columnar copy (dataset.py)
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from dataset import convert_csv, read_dataset
+
+# ---------- CONFIG ----------
+DATA_PATH = "stroke_data.csv"
+OUTPUT_DIR = "synthetic"
+CHUNK_ROWS = 1_000_000
+SEED = 42
+AGE_NOISE = 1.0                 # years (sd); ages >= 2 stay whole years like the source
+GLUCOSE_NOISE = 0.03            # relative (sd)
+BMI_NOISE = 0.5                 # kg/m^2 (sd)
+# -----------------------------
+
+
+def output_path(n_rows, output_dir=OUTPUT_DIR):
+    return os.path.join(output_dir, f"stroke_{n_rows}.csv")
+
+
+def _jitter(rows, rng, limits):
+    n = len(rows)
+    age = rows["age"].to_numpy()
+    noisy_age = age + rng.normal(0, AGE_NOISE, n)
+    # infants keep fractional ages, everyone else whole years
+    rows["age"] = np.where(age >= 2, np.round(noisy_age), np.round(age * np.exp(rng.normal(0, 0.1, n)), 2))
+    rows["age"] = rows["age"].clip(*limits["age"])
+
+    glucose = rows["avg_glucose_level"] * np.exp(rng.normal(0, GLUCOSE_NOISE, n))
+    rows["avg_glucose_level"] = glucose.clip(*limits["avg_glucose_level"]).round(2)
+
+    bmi = rows["bmi"] + rng.normal(0, BMI_NOISE, n)     # NaN stays NaN
+    rows["bmi"] = bmi.clip(*limits["bmi"]).round(1)
+    return rows
+
+
+def generate(n_rows, path=None, source=DATA_PATH, chunk_rows=CHUNK_ROWS, seed=SEED):
+    """Writes n_rows synthetic rows to path (CSV) and returns the path."""
+    path = path or output_path(n_rows)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    df = read_dataset(source)
+    columns = list(df.columns)
+    limits = {c: (df[c].min(), df[c].max()) for c in ["age", "avg_glucose_level", "bmi"]}
+    rows_of = {label: np.flatnonzero(df["stroke"].to_numpy() == label) for label in (0, 1)}
+
+    # exact class counts, spread over the chunks at random
+    n_pos = int(round(n_rows * df["stroke"].mean()))
+    labels = np.zeros(n_rows, dtype=np.int8)
+    labels[rng.choice(n_rows, n_pos, replace=False)] = 1
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", newline="") as f:
+        for start in range(0, n_rows, chunk_rows):
+            chunk_labels = labels[start:start + chunk_rows]
+            # a random real row of the same class for every output row
+            picks = np.empty(len(chunk_labels), dtype=np.int64)
+            for label, source_rows in rows_of.items():
+                mask = chunk_labels == label
+                picks[mask] = rng.choice(source_rows, mask.sum())
+            rows = df.iloc[picks].reset_index(drop=True)
+
+            rows = _jitter(rows, rng, limits)
+            rows["id"] = np.arange(start + 1, start + len(rows) + 1)
+            rows[columns].to_csv(f, header=start == 0, index=False, na_rep="N/A")
+    os.replace(tmp, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic stroke data at scale")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--out", default=None, help=f"default: {OUTPUT_DIR}/stroke_<rows>.csv")
+    parser.add_argument("--source", default=DATA_PATH)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--convert", action="store_true", help="also write the columnar copy (dataset.py)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    path = generate(args.rows, args.out, args.source, seed=args.seed)
+    print(f"✅ {args.rows:,} rows -> {path} in {time.perf_counter() - start:.1f}s")
+    if args.convert:
+        print(f"✅ Columnar copy -> {convert_csv(path)}/")
+
+
+if __name__ == "__main__":
+    main()
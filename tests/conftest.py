@@ -0,0 +1,39 @@
+# tests/conftest.py
+#
+# Parity checks for the vectorized / compiled code paths against the
+# reference implementations they replaced (the original if/elif chains,
+# predict_proba, sklearn metrics, /predict vs /predict_batch). Run from the
+# repo root:
+#
+#   python -m pytest -q tests/
+
+import json
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+os.chdir(REPO_DIR)      # scripts use repo-relative paths (overrides.json, stroke_data.csv)
+
+
+@pytest.fixture(scope="session")
+def small_model(tmp_path_factory):
+    """(pipeline, held-out rows, model path, meta path): a small model fitted on
+    the first 2000 rows of stroke_data.csv, saved like train_pipeline.py does."""
+    import joblib
+
+    from train_pipeline import build_pipeline
+    from training_common import load_data
+
+    X, y = load_data()
+    X_fit, y_fit = X.iloc[:2000], y.iloc[:2000]
+    params = dict(n_estimators=30, max_depth=4, subsample=0.8, colsample_bytree=0.8)
+    pipe = build_pipeline(X_fit, params, imbalance="weights", y_train=y_fit).fit(X_fit, y_fit)
+
+    out = tmp_path_factory.mktemp("model")
+    joblib.dump(pipe, out / "xgb_pipe.joblib")
+    with open(out / "model_meta.json", "w") as f:
+        json.dump({"threshold": 0.3}, f)
+    return pipe, X.iloc[2000:3000], str(out / "xgb_pipe.joblib"), str(out / "model_meta.json")
@@ -0,0 +1,67 @@
+import importlib
+import json
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="module")
+def client(small_model, monkeypatch_module):
+    _, _, model_path, meta_path = small_model
+    monkeypatch_module.setenv("MODEL_PATH", model_path)
+    monkeypatch_module.setenv("META_PATH", meta_path)
+    monkeypatch_module.setenv("KERNEL_PATH", model_path + ".no-kernel.npz")
+    monkeypatch_module.setenv("MODEL_POLL_SECONDS", "0")
+    monkeypatch_module.setenv("REQUEST_LOG_PATH", "")
+    sys.modules.pop("main", None)
+    main = importlib.import_module("main")
+    with TestClient(main.app) as c:
+        yield c
+    sys.modules.pop("main", None)
+
+
+@pytest.fixture(scope="module")
+def monkeypatch_module():
+    with pytest.MonkeyPatch.context() as mp:
+        yield mp
+
+
+@pytest.fixture(scope="module")
+def records(small_model):
+    X = small_model[1].dropna(subset=["bmi"]).iloc[:40]
+    return json.loads(X.to_json(orient="records"))
+
+
+@pytest.mark.parametrize("query", ["", "?explain=true&top_k=3"])
+def test_batch_matches_single_predictions(client, records, query):
+    single = [client.post("/predict" + query, json=record).json() for record in records]
+    batch = client.post("/predict_batch" + query, json=records).json()["predictions"]
+    assert batch == single
+    assert all("error" not in result for result in batch)
+    if query:
+        assert all(len(result["explanation"]["top_features"]) == 3 for result in batch)
+
+
+def test_batch_errors_are_per_record(client, records):
+    bad_value = {**records[1], "smoking_status": "vapes"}
+    missing_field = {k: v for k, v in records[2].items() if k != "age"}
+    batch = [records[0], bad_value, missing_field, records[3]]
+    results = client.post("/predict_batch", json=batch).json()["predictions"]
+
+    assert len(results) == 4
+    assert results[0] == client.post("/predict", json=records[0]).json()
+    assert results[3] == client.post("/predict", json=records[3]).json()
+    assert results[1] == client.post("/predict", json=bad_value).json()
+    assert "smoking_status" in results[1]["error"]
+    assert "age" in results[2]["error"]
+
+
+def test_malformed_body_is_rejected(client):
+    assert client.post("/predict_batch", json={"not": "a list"}).status_code == 422
+    assert client.post("/predict_batch", json=[]).json() == {"predictions": []}
+
+
+@pytest.mark.parametrize("interval_ms", [0, -5, 60000])
+def test_profile_interval_is_validated(client, interval_ms):
+    assert client.post(f"/profile/start?interval_ms={interval_ms}").status_code == 422
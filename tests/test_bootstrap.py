@@ -0,0 +1,45 @@
+import numpy as np
+from sklearn.metrics import average_precision_score, f1_score, precision_score, recall_score
+
+import bootstrap_metrics
+from bootstrap_metrics import SEED, _chunk_metrics, _init_worker, bootstrap
+
+
+def make_data(n=400):
+    rng = np.random.default_rng(0)
+    y = rng.random(n) < 0.1
+    proba = np.round(np.clip(rng.normal(0.3 + 0.3 * y, 0.2), 0, 1), 2)   # with ties
+    return y, proba, proba >= 0.45
+
+
+def test_count_matrix_metrics_match_sklearn():
+    y, proba, pred = make_data()
+    _init_worker(y, proba, pred)
+    size = 20
+    got = _chunk_metrics(3, size)
+
+    # the same draws resample_counts() turns into counts
+    idx = np.random.default_rng([SEED, 3]).integers(0, len(y), size=(size, len(y)))
+    expected = np.array([
+        [
+            average_precision_score(y[i], proba[i]),
+            f1_score(y[i], pred[i], zero_division=0),
+            precision_score(y[i], pred[i], zero_division=0),
+            recall_score(y[i], pred[i], zero_division=0),
+        ]
+        for i in idx
+    ])
+    np.testing.assert_allclose(got, expected, rtol=1e-10, atol=1e-12)
+
+
+def test_results_independent_of_workers():
+    y, proba, pred = make_data()
+    one = bootstrap(y, proba, pred, n_resamples=60, workers=1, chunk=16)
+    two = bootstrap(y, proba, pred, n_resamples=60, workers=2, chunk=16)
+    assert one.shape == (60, len(bootstrap_metrics.METRICS))
+    np.testing.assert_allclose(one, two)
+
+
+def test_chunk_size_follows_byte_budget():
+    assert bootstrap_metrics.chunk_size(1000, chunk_bytes=8_000_000) == 1000
+    assert bootstrap_metrics.chunk_size(10**9, chunk_bytes=8_000_000) == 1
@@ -0,0 +1,13 @@
+import numpy as np
+
+from compile_model import CompiledModel
+
+
+def test_kernel_matches_predict_proba(small_model, tmp_path):
+    pipe, X = small_model[:2]
+    expected = pipe.predict_proba(X)[:, 1]
+    compiled = CompiledModel.from_pipeline(pipe)
+    compiled.save(tmp_path / "kernel.npz")
+    for model in (compiled, CompiledModel.load(tmp_path / "kernel.npz")):
+        got = model.predict_proba({c: X[c].to_numpy() for c in X.columns})[:, 1]
+        np.testing.assert_allclose(got, expected, rtol=0, atol=1e-6)
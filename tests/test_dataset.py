@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from dataset import convert_csv, load_frame
+
+
+def test_later_chunks_widen_integer_columns(tmp_path):
+    # the first chunk types "age" as int64; later chunks bring a fractional
+    # value and a missing one, which must not be truncated
+    csv = tmp_path / "data.csv"
+    csv.write_text("age,work_type,stroke\n"
+                   "61,Private,1\n80,Private,1\n"
+                   "49.5,Self-employed,0\n79,,1\n"
+                   ",Govt_job,0\n")
+    store = convert_csv(str(csv), chunk_rows=2)
+
+    frame = load_frame(store)
+    np.testing.assert_array_equal(frame["age"], [61, 80, 49.5, 79, np.nan])
+    assert frame["stroke"].dtype == np.int64
+    assert frame["work_type"].isna().tolist() == [False, False, False, True, False]
+
+
+def test_load_frame_keeps_the_memory_maps(tmp_path):
+    csv = tmp_path / "data.csv"
+    pd.DataFrame({"age": np.arange(100.0), "bmi": np.arange(100.0) / 3}).to_csv(csv, index=False)
+    frame = load_frame(convert_csv(str(csv)))
+    for name in frame:
+        data = frame[name].to_numpy()
+        while data.base is not None and not isinstance(data, np.memmap):
+            data = data.base
+        assert isinstance(data, np.memmap), name
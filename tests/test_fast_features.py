@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+from fast_features import FastFeatures, records_to_columns
+from model_registry import SMOKE_RECORD
+
+
+def test_fast_features_match_pipeline_preprocessing(small_model):
+    pipe, X = small_model[:2]
+    expected = pipe.named_steps["preprocessing"].transform(pipe.named_steps["feature_engineering"].transform(X))
+    expected = expected.toarray() if hasattr(expected, "toarray") else expected
+    got = FastFeatures.from_pipeline(pipe).transform({c: X[c].to_numpy() for c in X.columns})
+    np.testing.assert_allclose(got, expected, rtol=1e-6, atol=1e-6)
+
+
+def test_unknown_smoking_status_names_the_field(small_model):
+    features = FastFeatures.from_pipeline(small_model[0])
+    with pytest.raises(ValueError, match="smoking_status 'vapes'.*never smoked"):
+        features.transform(records_to_columns([{**SMOKE_RECORD, "smoking_status": "vapes"}]))
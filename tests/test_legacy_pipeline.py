@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+from imblearn.pipeline import Pipeline as ImbPipeline
+from sklearn.preprocessing import FunctionTransformer
+
+from preprocessing import feature_engineering, upgrade_legacy_pipeline
+
+
+def test_legacy_pipeline_upgrade_scores_like_feature_engineer(small_model):
+    pipe, X = small_model[:2]
+    expected = pipe.predict_proba(X)[:, 1]
+    quantiles = pipe.named_steps["feature_engineering"].glucose_quantiles_
+    # what pipelines saved before FeatureEngineer look like
+    legacy = ImbPipeline([("feature_engineering", FunctionTransformer(feature_engineering))] + pipe.steps[1:])
+
+    with pytest.raises(ValueError):
+        upgrade_legacy_pipeline(legacy, {})
+    upgrade_legacy_pipeline(legacy, {"glucose_quantiles": list(quantiles)})
+    # a handful of rows: the legacy step would take the quartiles from just these
+    np.testing.assert_allclose(legacy.predict_proba(X.iloc[:7])[:, 1], expected[:7], rtol=0, atol=1e-7)
@@ -0,0 +1,78 @@
+import numpy as np
+
+from overrides import OverrideTable
+
+
+def original_overrides(prob, bmi, smoking_status, residence, glucose):
+    # the per-request if/elif chains main.py had before overrides.json
+    if residence == "Rural":
+        prob -= 0.02
+    elif residence == "Urban":
+        prob += 0.00
+
+    if smoking_status == "smokes":
+        prob += 0.06
+    elif smoking_status == "formerly smoked":
+        prob += 0.02
+    elif smoking_status == "never smoked":
+        prob += 0.00
+    elif smoking_status == "Unknown":
+        prob += 0.01
+
+    if bmi < 16:
+        prob += 0.05
+    elif bmi < 18.5:
+        prob += 0.03
+    elif 30 <= bmi < 35:
+        prob += 0.02
+    elif 35 <= bmi < 40:
+        prob += 0.05
+    elif 40 <= bmi < 50:
+        prob += 0.08
+    elif 50 <= bmi < 60:
+        prob += 0.12
+    elif 70 <= bmi < 80:
+        prob += 0.15
+    elif 80 <= bmi < 90:
+        prob += 0.20
+    elif bmi >= 90:
+        prob += 0.28
+
+    if glucose < 70:
+        prob += 0.03
+    elif 100 <= glucose < 126:
+        prob += 0.02
+    elif 126 <= glucose < 200:
+        prob += 0.05
+    elif 200 <= glucose < 300:
+        prob += 0.10
+    elif glucose >= 300:
+        prob += 0.15
+
+    return min(max(float(prob), 0), 1)
+
+
+def test_table_matches_original_chains():
+    rng = np.random.default_rng(0)
+    n = 5000
+    bmi_edges = [16, 18.5, 30, 35, 40, 50, 60, 70, 80, 90]
+    glucose_edges = [70, 100, 126, 200, 300]
+    # random values, every edge exactly, and missing values
+    bmi = np.r_[rng.uniform(10, 100, n), bmi_edges, np.nan]
+    glucose = np.r_[rng.uniform(50, 350, n), glucose_edges, [100.0] * 5, np.nan]
+    m = len(bmi)
+    cols = {
+        "bmi": bmi,
+        "avg_glucose_level": glucose,
+        "smoking_status": rng.choice(["smokes", "formerly smoked", "never smoked", "Unknown", "unknown"], m),
+        "Residence_type": rng.choice(["Rural", "Urban", "rural"], m),
+    }
+    prob = rng.uniform(0, 1, m)
+
+    expected = [
+        original_overrides(p, b, s, r, g)
+        for p, b, s, r, g in zip(prob, cols["bmi"], cols["smoking_status"],
+                                 cols["Residence_type"], cols["avg_glucose_level"])
+    ]
+    got = OverrideTable.load("overrides.json").apply(prob, cols)
+    np.testing.assert_allclose(got, expected, rtol=0, atol=1e-12)
@@ -0,0 +1,19 @@
+from stage_cache import canonical_params, make_key
+from train_pipeline import XGB_PARAMS, build_pipeline
+from training_common import load_data
+
+
+def step_keys(pipe):
+    return [make_key(name, canonical_params(step)) for name, step in pipe.steps[:-1]]
+
+
+def test_keys_are_stable_and_see_nested_params():
+    X, _ = load_data()
+    first = build_pipeline(X, XGB_PARAMS, "smote")
+    second = build_pipeline(X, XGB_PARAMS, "smote")
+    assert step_keys(first) == step_keys(second)
+
+    # a param deep inside the ColumnTransformer changes that stage only
+    second.set_params(preprocessing__num__imputer__strategy="mean")
+    changed = [a != b for a, b in zip(step_keys(first), step_keys(second))]
+    assert changed == [False, True, False]
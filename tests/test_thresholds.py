@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+from sklearn.metrics import fbeta_score, precision_recall_curve
+
+from thresholds import select_threshold, threshold_curve
+
+
+def make_scores(seed, n=3000):
+    rng = np.random.default_rng(seed)
+    y = rng.random(n) < 0.08
+    # rounded, so there are plenty of tied scores
+    score = np.round(np.clip(rng.normal(0.3 + 0.3 * y, 0.2), 0, 1), 3)
+    return y, score
+
+
+def test_curve_matches_sklearn_precision_recall_curve():
+    y, score = make_scores(0)
+    curve = threshold_curve(y, score, beta=2.0)
+    precision, recall, thresholds = precision_recall_curve(y, score)
+
+    # sklearn: ascending thresholds + a final (precision=1, recall=0) point
+    index = {t: i for i, t in enumerate(curve["threshold"])}
+    i = [index[t] for t in thresholds]
+    np.testing.assert_allclose(curve["precision"][i], precision[:-1])
+    np.testing.assert_allclose(curve["recall"][i], recall[:-1])
+
+
+def test_f_beta_matches_sklearn():
+    y, score = make_scores(1)
+    curve = threshold_curve(y, score, beta=2.0)
+    for i in range(0, len(curve["threshold"]), 25):
+        pred = score >= curve["threshold"][i]
+        np.testing.assert_allclose(curve["f_beta"][i], fbeta_score(y, pred, beta=2.0, zero_division=0))
+
+
+def test_target_recall_picks_highest_threshold():
+    y, score = make_scores(2)
+    threshold, curve = select_threshold(y, score, target_recall=0.8)
+    recall = lambda t: (score[y] >= t).mean()
+    assert recall(threshold) >= 0.8
+    higher = curve["threshold"][curve["threshold"] > threshold]
+    assert all(recall(t) < 0.8 for t in higher)
+
+
+def test_meta_curve_has_fixed_size():
+    from training_common import CURVE_POINTS, threshold_meta
+
+    y, score = make_scores(3, n=50_000)
+    score = score + np.random.default_rng(3).random(len(score)) * 1e-4    # ~every score distinct
+    meta = threshold_meta(y, score)
+    curve = meta["threshold_curve"]
+    assert len(curve["threshold"]) == CURVE_POINTS
+    full = threshold_curve(y, score, beta=2.0)
+    assert curve["threshold"][0] == round(full["threshold"][0], 6)
+    assert curve["threshold"][-1] == round(full["threshold"][-1], 6)
+    assert len(json.dumps(meta)) < 20_000
+    i = int(np.searchsorted(-full["threshold"], -meta["threshold"]))
+    assert meta["threshold_selection"]["recall"] == full["recall"][i]
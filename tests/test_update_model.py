@@ -0,0 +1,46 @@
+import io
+import json
+
+import joblib
+import numpy as np
+import pytest
+
+from train_pipeline import build_pipeline
+from training_common import load_data
+from update_model import booster_scale_pos_weight, warm_start
+
+
+def saved_scale_pos_weight(pipe):
+    # what a promoted artifact trains the next update with
+    buffer = io.BytesIO()
+    joblib.dump(pipe, buffer)
+    buffer.seek(0)
+    booster = joblib.load(buffer).steps[-1][1].get_booster()
+    return float(json.loads(booster.save_config())["learner"]["objective"]["reg_loss_param"]["scale_pos_weight"])
+
+
+@pytest.fixture(scope="module")
+def smote_model():
+    X, y = load_data()
+    params = dict(n_estimators=20, max_depth=3)
+    # the positives are all at the top of stroke_data.csv: interleave the split
+    X_fit, y_fit = X.iloc[:4000:2], y.iloc[:4000:2]
+    pipe = build_pipeline(X_fit, params, imbalance="smote").fit(X_fit, y_fit)
+    return pipe, X.iloc[1::2], y.iloc[1::2]
+
+
+def test_weighted_rounds_dont_leak_into_the_next_update(smote_model):
+    pipe, X, y = smote_model
+    assert booster_scale_pos_weight(pipe.steps[-1][1]) == 1
+
+    # 3 positives: too few for SMOTE (k=5), so this update weights the positives
+    pos, neg = np.flatnonzero(y == 1), np.flatnonzero(y == 0)
+    small = np.r_[pos[:3], neg[:300]]
+    first = warm_start(pipe, X.iloc[small], y.iloc[small], rounds=5)
+    assert saved_scale_pos_weight(first) == 1
+
+    # enough positives: SMOTE again, with the parent's weight of 1
+    large = np.r_[pos[3:60], neg[300:1500]]
+    second = warm_start(first, X.iloc[large], y.iloc[large], rounds=5)
+    assert saved_scale_pos_weight(second) == 1
+    assert second.steps[-1][1].get_booster().num_boosted_rounds() == 30
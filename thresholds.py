@@ -0,0 +1,72 @@
+# thresholds.py
+#
+# Decision-threshold selection over every candidate cut at once. Sorting the
+# scores once and taking cumulative sums of the labels gives TP/FP at every
+# distinct score in O(n log n), instead of one sklearn metric call per
+# threshold.
+
+import numpy as np
+
+
+def threshold_curve(y_true, y_score, beta=1.0):
+    """Precision / recall / F-beta for predicting positive when score >= threshold,
+    for every distinct score (thresholds in decreasing order)."""
+    y_true = np.asarray(y_true, dtype=bool)
+    y_score = np.asarray(y_score, dtype=float)
+
+    order = np.argsort(-y_score, kind="mergesort")
+    scores = y_score[order]
+    tp = np.cumsum(y_true[order])
+    fp = np.arange(1, len(scores) + 1) - tp
+
+    # last position of each run of tied scores = everything >= that score
+    last = np.r_[np.flatnonzero(np.diff(scores)), len(scores) - 1]
+    tp, fp, thresholds = tp[last], fp[last], scores[last]
+
+    n_pos = y_true.sum()
+    precision = tp / (tp + fp)
+    recall = tp / n_pos if n_pos else np.zeros_like(tp, dtype=float)
+    b2 = beta ** 2
+    denom = b2 * precision + recall
+    f_beta = np.divide((1 + b2) * precision * recall, denom,
+                       out=np.zeros_like(denom), where=denom > 0)
+    return {
+        "threshold": thresholds,
+        "precision": precision,
+        "recall": recall,
+        "f_beta": f_beta,
+        "tp": tp,
+        "fp": fp,
+    }
+
+
+def select_threshold(y_true, y_score, target_recall=None, beta=1.0):
+    """Highest threshold reaching target_recall, or the F-beta maximizer.
+
+    Returns (threshold, curve).
+    """
+    curve = threshold_curve(y_true, y_score, beta)
+    if target_recall is not None:
+        # recall only grows as the threshold drops; first hit = highest threshold
+        i = int(np.argmax(curve["recall"] >= target_recall))
+        if curve["recall"][i] < target_recall:
+            raise ValueError(f"target recall {target_recall} is not reachable")
+    else:
+        i = int(np.argmax(curve["f_beta"]))
+    return float(curve["threshold"][i]), curve
+
+
+def downsample_curve(curve, n_points=101):
+    # n_points evenly spaced along the curve (by threshold rank, first and last
+    # kept), so its size doesn't grow with the hold-out set
+    n = len(curve["threshold"])
+    idx = np.unique(np.linspace(0, n - 1, min(n, n_points)).round().astype(int))
+    return {name: values[idx] for name, values in curve.items()}
+
+
+def curve_to_json(curve, digits=6):
+    # for model_meta.json
+    return {
+        name: np.round(values, digits).tolist() if values.dtype.kind == "f" else values.tolist()
+        for name, values in curve.items()
+    }
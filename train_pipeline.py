@@ -1,104 +1,141 @@
 # train_pipeline.py
-
-import pandas as pd
-import numpy as np
-import joblib
+#
+#   python train_pipeline.py                    # fit XGB_PARAMS, save xgb_pipe.joblib + model_meta.json
+#   python train_pipeline.py --search           # stratified K-fold search first, then fit the best params
+#   python train_pipeline.py --search --grid    # every SEARCH_SPACE combination instead of random trials
+#   python train_pipeline.py --imbalance weights   # scale_pos_weight instead of SMOTE (see imbalance.py)
+#
+# Preprocessing stages (CSV load, FeatureEngineer, ColumnTransformer, SMOTE)
+# are cached in .stage_cache/ keyed on the data + code + params, so rerunning
+# with different XGBoost params only refits the model. --no-cache disables it.
+
+import argparse
+import inspect
+import dataset
 from sklearn.model_selection import train_test_split
-from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import OneHotEncoder, StandardScaler, FunctionTransformer
 from xgboost import XGBClassifier
-from imblearn.over_sampling import SMOTE
 from imblearn.pipeline import Pipeline as ImbPipeline
-from sklearn.impute import SimpleImputer
-from preprocessing import feature_engineering
-
-XGBClassifier
-# Load data
-df = pd.read_csv("stroke_data.csv")
-
-# Drop unused or inconsistent columns
-if "id" in df.columns:
-    df = df.drop(columns=["id"])
-
-# Recode rare work_type categories
-df['work_type'] = df['work_type'].replace({
-    'Never_worked': 'Other',
-    'children': 'Other'
-})
-
-
-# Train-test split
-X = df.drop("stroke", axis=1)
-y = df["stroke"]
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, stratify=y, test_size=0.2, random_state=42)
-
-def preprocess_pipe():
-    engineered = feature_engineering(X_train)
-
-    cat = engineered.select_dtypes(include=["object", "category"]).columns.tolist()
-    num = engineered.select_dtypes(include=["int64", "float64"]).columns.tolist()
-
-    num_pipeline = Pipeline([
-        ("imputer", SimpleImputer(strategy="median")),
-        ("scaler", StandardScaler())
-    ])
-
-    cat_pipeline = Pipeline([
-        ("imputer", SimpleImputer(strategy="most_frequent")),
-        ("encoder", OneHotEncoder(handle_unknown="ignore"))
-    ])
-
-    return ColumnTransformer([
-        ("num", num_pipeline, num),
-        ("cat", cat_pipeline, cat)
-    ])
-    
-
-# Full pipeline
-pipe = ImbPipeline(steps=[
-    ("feature_engineering", FunctionTransformer(feature_engineering)),
-    ("preprocessing", preprocess_pipe()),
-    ("smote", SMOTE(random_state=42)),
-    ("model", XGBClassifier(
-    objective="binary:logistic",
-    eval_metric="logloss",
-    use_label_encoder=False,
-    random_state=42,
+from preprocessing import FeatureEngineer
+from imbalance import STRATEGIES, class_weight_params, make_sampler
+from compile_model import file_sha256
+from stage_cache import StageCache, fit_steps_cached, make_key
+# paths, split, threshold settings and the data / artifact helpers are shared
+# with external_training.py and update_model.py
+from training_common import (DATA_PATH, F_BETA, RANDOM_STATE, TARGET_RECALL, TEST_SIZE, clean_data,
+                             load_data, preprocess_pipe, save_artifacts, with_overrides)
+
+# ---------- CONFIG ----------
+# Class imbalance: "smote", "approx_smote", "undersample" or "weights" (see imbalance.py)
+IMBALANCE = "smote"
+XGB_PARAMS = dict(
     max_depth=3,              # reduce tree complexity
     min_child_weight=2,
     gamma=0.1,
     subsample=0.8,
     colsample_bytree=0.8,
     reg_alpha=0.1,            # L1 regularization
-    reg_lambda=1.0            # L2 regularization
-    ))
-    
-])
-drop_cols = ['id', 'work_type']  # any others you don’t need
-
-drop_cols = ['id']
-drop_cols = [col for col in drop_cols if col in df.columns]
-X = df.drop(columns=['stroke'] + drop_cols)
-
-y = df['stroke']
-
-
-
-
-# Fit and save
-pipe.fit(X_train, y_train)
-
-joblib.dump(pipe, "xgb_pipe.joblib")
-
-# Save threshold (optional)
-import json
-probs = pipe.predict_proba(X_test)[:, 1]
-threshold = 0.3
-json.dump({"threshold": threshold}, open("model_meta.json", "w"))
-
-print("Incoming columns:", df.columns.tolist())
-
-
-
+    reg_lambda=1.0,           # L2 regularization
+)
+# -----------------------------
+
+
+def build_pipeline(X_train, params=XGB_PARAMS, imbalance=IMBALANCE, y_train=None):
+    if imbalance == "weights" and y_train is None:
+        raise ValueError('imbalance="weights" needs y_train for scale_pos_weight')
+    steps = [
+        ("feature_engineering", FeatureEngineer()),
+        ("preprocessing", preprocess_pipe(X_train)),
+    ]
+    sampler = make_sampler(imbalance, random_state=RANDOM_STATE)
+    if sampler is not None:
+        steps.append((imbalance, sampler))
+    steps.append(("model", XGBClassifier(
+        objective="binary:logistic",
+        eval_metric="logloss",
+        use_label_encoder=False,
+        random_state=RANDOM_STATE,
+        **{**params, **class_weight_params(imbalance, y_train)}
+    )))
+    return ImbPipeline(steps=steps)
+
+
+def fit_pipeline(pipe, X_train, y_train, data_key=None, cache=None):
+    if cache is None:
+        return pipe.fit(X_train, y_train)
+    X, y = fit_steps_cached(pipe, X_train, y_train, data_key, cache)
+    pipe.steps[-1][1].fit(X, y)
+    return pipe
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the stroke XGBoost pipeline")
+    parser.add_argument("--search", action="store_true", help="cross-validated hyperparameter search first")
+    parser.add_argument("--grid", action="store_true", help="grid instead of random search")
+    parser.add_argument("--trials", type=int, default=None, help="random search trials")
+    parser.add_argument("--folds", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="search processes (default: all cores)")
+    parser.add_argument("--target-recall", type=float, default=TARGET_RECALL,
+                        help="pick the highest threshold with at least this recall")
+    parser.add_argument("--beta", type=float, default=F_BETA, help="otherwise maximize F-beta")
+    parser.add_argument("--imbalance", choices=STRATEGIES, default=IMBALANCE,
+                        help="class-imbalance strategy (see imbalance.py)")
+    parser.add_argument("--no-cache", action="store_true", help="don't use the .stage_cache/ stage cache")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--external", action="store_true",
+                        help="out-of-core: stream chunks into an external-memory DMatrix (no SMOTE)")
+    parser.add_argument("--chunk-rows", type=int, default=None, help="rows per chunk with --external")
+    args = parser.parse_args()
+
+    if args.external:
+        if args.search:
+            parser.error("--search needs the data in memory; it can't be combined with --external")
+        from external_training import CHUNK_ROWS, train_external
+
+        pipe, y_test, probs, training = train_external(args.data, dict(XGB_PARAMS), args.chunk_rows or CHUNK_ROWS)
+        save_artifacts(pipe, y_test, probs, args.target_recall, args.beta, training)
+        return
+
+    cache = None if args.no_cache else StageCache()
+
+    # Load data
+    if cache is None:
+        X, y = load_data(args.data)
+    else:
+        load_key = make_key("load_data", file_sha256(args.data), inspect.getsource(dataset),
+                            inspect.getsource(load_data), inspect.getsource(clean_data))
+        X, y = cache.get_or_compute("load_data", load_key, lambda: load_data(args.data))
+    print("Incoming columns:", X.columns.tolist() + [y.name])
+
+    # Train-test split
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, stratify=y, test_size=TEST_SIZE, random_state=RANDOM_STATE
+    )
+
+    params = dict(XGB_PARAMS)
+    if args.search:
+        # imported here so plain training doesn't need the search machinery
+        from hyperparam_search import N_FOLDS, N_TRIALS, run_search
+
+        params = run_search(
+            X_train, y_train, preprocess_pipe,
+            n_folds=args.folds or N_FOLDS,
+            n_trials=args.trials or N_TRIALS,
+            grid=args.grid,
+            workers=args.workers,
+            make_sampler=lambda: make_sampler(args.imbalance, random_state=RANDOM_STATE),
+            fixed_params=class_weight_params(args.imbalance, y_train),
+        )
+
+    # Fit and save
+    pipe = build_pipeline(X_train, params, args.imbalance, y_train)
+    data_key = make_key(load_key, "train_test_split", TEST_SIZE, RANDOM_STATE) if cache else None
+    fit_pipeline(pipe, X_train, y_train, data_key, cache)
+    if cache is not None:
+        print(f"   {cache.summary()}")
+
+    probs = with_overrides(pipe.predict_proba(X_test)[:, 1], X_test)
+    save_artifacts(pipe, y_test, probs, args.target_recall, args.beta)
+
+
+if __name__ == "__main__":
+    main()
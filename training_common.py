@@ -0,0 +1,118 @@
+# training_common.py
+#
+# The pieces every training entry point shares: loading + cleaning the data,
+# the preprocessing ColumnTransformer, the decision threshold and writing
+# xgb_pipe.joblib / model_meta.json. train_pipeline.py, external_training.py
+# and update_model.py all import from here, so none of them has to import
+# another training script.
+
+import json
+
+import joblib
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from dataset import read_dataset
+from overrides import OverrideTable
+from preprocessing import FeatureEngineer
+from thresholds import curve_to_json, downsample_curve, select_threshold
+
+# ---------- CONFIG ----------
+DATA_PATH = "stroke_data.csv"
+MODEL_PATH = "xgb_pipe.joblib"
+META_PATH = "model_meta.json"
+OVERRIDES_PATH = "overrides.json"       # the API adds these rules to the model probability
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+# Decision threshold, picked on the hold-out set: the highest cut that reaches
+# TARGET_RECALL if set, otherwise the one maximizing F-beta (beta > 1 favours
+# recall - the app is tuned to catch more high-risk users). The API compares it
+# to the probability after overrides.json, so it is picked on those too.
+TARGET_RECALL = None
+F_BETA = 2.0
+CURVE_POINTS = 101                      # threshold curve points kept in model_meta.json
+# -----------------------------
+
+
+def load_data(path=DATA_PATH):
+    return clean_data(read_dataset(path))
+
+
+def clean_data(df):
+    # Drop unused or inconsistent columns
+    if "id" in df.columns:
+        df = df.drop(columns=["id"])
+
+    # Recode rare work_type categories
+    df['work_type'] = df['work_type'].replace({
+        'Never_worked': 'Other',
+        'children': 'Other'
+    })
+
+    X = df.drop("stroke", axis=1)
+    y = df["stroke"]
+    return X, y
+
+
+def preprocess_pipe(X_train):
+    engineered = FeatureEngineer().fit_transform(X_train)
+
+    cat = engineered.select_dtypes(include=["object", "category"]).columns.tolist()
+    num = engineered.select_dtypes(include=["int64", "float64"]).columns.tolist()
+
+    num_pipeline = Pipeline([
+        ("imputer", SimpleImputer(strategy="median")),
+        ("scaler", StandardScaler())
+    ])
+
+    cat_pipeline = Pipeline([
+        ("imputer", SimpleImputer(strategy="most_frequent")),
+        ("encoder", OneHotEncoder(handle_unknown="ignore"))
+    ])
+
+    return ColumnTransformer([
+        ("num", num_pipeline, num),
+        ("cat", cat_pipeline, cat)
+    ])
+
+
+def with_overrides(probs, X, overrides_path=OVERRIDES_PATH):
+    # model probabilities -> what the API serves (and compares to the threshold)
+    return OverrideTable.load(overrides_path).apply(probs, X)
+
+
+def threshold_meta(y_test, probs, target_recall=TARGET_RECALL, beta=F_BETA):
+    # Pick the decision threshold (read by main.py and metrics_report.py) on the
+    # hold-out set; probs must already include the overrides (with_overrides)
+    threshold, curve = select_threshold(y_test, probs, target_recall=target_recall, beta=beta)
+    i = int(np.searchsorted(-curve["threshold"], -threshold))
+    print(f"🎯 Threshold {threshold:.4f}: precision {curve['precision'][i]:.3f}, "
+          f"recall {curve['recall'][i]:.3f}, F{beta:g} {curve['f_beta'][i]:.3f}")
+    return {
+        "threshold": threshold,
+        "threshold_selection": {
+            "target_recall": target_recall,
+            "beta": beta,
+            "n_holdout": int(len(y_test)),
+            "overrides": OverrideTable.load(OVERRIDES_PATH).version,
+            "precision": float(curve["precision"][i]),
+            "recall": float(curve["recall"][i]),
+            "f_beta": float(curve["f_beta"][i]),
+        },
+        # fixed size: the registry re-reads this file on every hot reload
+        "threshold_curve": curve_to_json(downsample_curve(curve, CURVE_POINTS)),
+    }
+
+
+def save_artifacts(pipe, y_test, probs, target_recall=TARGET_RECALL, beta=F_BETA, training=None):
+    meta = threshold_meta(y_test, probs, target_recall, beta)
+    if training is not None:
+        meta["training"] = training
+
+    joblib.dump(pipe, MODEL_PATH)
+    with open(META_PATH, "w") as f:
+        json.dump(meta, f)
+    print(f"✅ Saved {MODEL_PATH} and {META_PATH}")
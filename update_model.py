@@ -0,0 +1,197 @@
+# update_model.py
+#
+# Incremental retraining: continue boosting the current model on newly
+# labelled rows only, instead of retraining on everything.
+#
+#   python update_model.py new_outcomes.csv                 # -> models/xgb_pipe-<version>.joblib + meta
+#   python update_model.py new_outcomes.csv --rounds 50 --learning-rate 0.05
+#   python update_model.py new_outcomes.csv --promote       # + swap it into xgb_pipe.joblib / model_meta.json
+#
+# The fitted FeatureEngineer + ColumnTransformer are kept frozen (transform
+# only), so the model matrix keeps its columns. The delta is split into a fit
+# part and a hold-out part (TEST_SIZE, stratified); the fit part goes through
+# the same kind of resampling step the pipeline was trained with (stateless,
+# refitted on the delta) and XGBoost adds --rounds trees to the existing
+# booster with the original params. A delta with too few positives for SMOTE's
+# k neighbours gets scale_pos_weight for these rounds instead. The cost grows
+# with the delta, not with the full dataset. Pipelines saved before
+# FeatureEngineer are loaded with the training glucose quartiles from the
+# parent's model_meta.json (preprocessing.load_pipeline), not the delta's.
+#
+# The decision threshold is carried over from the parent model unless
+# --retune-threshold picks it again on the delta's hold-out part (noisy for
+# small deltas). The new artifact is versioned like the API does it (first 12
+# hex digits of its sha256) and model_meta.json gains a "training" block with
+# the parent version, the data and the hold-out PR-AUC before and after.
+#
+# --promote refuses an update that lowers hold-out PR-AUC (unless --force) and
+# otherwise installs the files with os.replace, which the API's registry picks
+# up without a restart. Both renames happen back to back and the registry only
+# reloads once the files have stopped changing for a poll, loading model and
+# meta together, so the old booster is never served with the new threshold.
+# Recompile xgb_kernel.npz / xgb_kernel/ afterwards if you serve the compiled
+# model.
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+from imblearn.pipeline import Pipeline as ImbPipeline
+from sklearn.base import clone
+from sklearn.metrics import average_precision_score
+from sklearn.model_selection import train_test_split
+from xgboost import XGBClassifier
+
+from compile_model import file_sha256
+from imbalance import class_weight_params
+from preprocessing import load_pipeline
+from training_common import (F_BETA, META_PATH, MODEL_PATH, RANDOM_STATE, TARGET_RECALL, TEST_SIZE,
+                             load_data, threshold_meta, with_overrides)
+
+# ---------- CONFIG ----------
+OUTPUT_DIR = "models"           # versioned artifacts
+N_ROUNDS = 20                   # trees added per update
+# -----------------------------
+
+
+def booster_scale_pos_weight(model):
+    # what the booster trains with - the sklearn wrapper's param can say None
+    config = json.loads(model.get_booster().save_config())
+    return float(config["learner"]["objective"].get("reg_loss_param", {}).get("scale_pos_weight", 1))
+
+
+def warm_start(pipe, X, y, rounds=N_ROUNDS, learning_rate=None):
+    """A new pipeline: pipe's fitted preprocessing + its booster with `rounds`
+    more trees fitted on (X, y). pipe itself is left untouched."""
+    steps = dict(pipe.steps)
+    Xt = steps["preprocessing"].transform(steps["feature_engineering"].transform(X))
+    weights = {}
+    for name, step in pipe.steps[2:-1]:
+        if not hasattr(step, "fit_resample"):
+            continue
+        n_minority = int(np.bincount(np.asarray(y)).min())
+        k = getattr(step, "k_neighbors", 0)
+        if isinstance(k, int) and n_minority <= k:
+            # SMOTE needs more than k minority rows to interpolate between
+            print(f"⚠️ Only {n_minority} minority rows, {name} needs more than k_neighbors={k}: "
+                  f"weighting the positives (scale_pos_weight) instead of resampling")
+            weights = class_weight_params("weights", y)
+            continue
+        Xt, y = clone(step).fit_resample(Xt, y)
+
+    old = pipe.steps[-1][1]
+    parent_weight = booster_scale_pos_weight(old)
+    params = {**old.get_params(), "n_estimators": rounds, "scale_pos_weight": parent_weight, **weights}
+    if learning_rate is not None:
+        params["learning_rate"] = learning_rate
+    model = XGBClassifier(**params)
+    model.fit(Xt, y, xgb_model=old.get_booster())
+    # only for these rounds: put the parent's value back on the booster that
+    # gets saved (not just the wrapper), so the next update starts from it
+    model.set_params(scale_pos_weight=parent_weight)
+    model.get_booster().set_param("scale_pos_weight", parent_weight)
+    return ImbPipeline(steps=pipe.steps[:-1] + [(pipe.steps[-1][0], model)])
+
+
+def save_versioned(pipe, meta, output_dir=OUTPUT_DIR):
+    """Writes models/xgb_pipe-<version>.joblib + model_meta-<version>.json; returns (version, paths)."""
+    os.makedirs(output_dir, exist_ok=True)
+    tmp = os.path.join(output_dir, f".xgb_pipe-{os.getpid()}.joblib.tmp")
+    joblib.dump(pipe, tmp)
+    version = file_sha256(tmp)[:12]
+    model_path = os.path.join(output_dir, f"xgb_pipe-{version}.joblib")
+    meta_path = os.path.join(output_dir, f"model_meta-{version}.json")
+    meta["training"]["version"] = version
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, model_path)
+    return version, model_path, meta_path
+
+
+def promote(model_path, meta_path):
+    # copy both next to the live files first, then rename them over the live
+    # ones back to back: the registry never sees a half-written file, and the
+    # pair changes within one poll, so it reloads model + meta together
+    pairs = [(meta_path, META_PATH), (model_path, MODEL_PATH)]
+    for src, dst in pairs:
+        shutil.copyfile(src, f"{dst}.tmp")
+    for _, dst in pairs:
+        os.replace(f"{dst}.tmp", dst)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm-start the current model on new labelled data")
+    parser.add_argument("data", help="CSV with the training schema (incl. stroke) - only the new rows")
+    parser.add_argument("--rounds", type=int, default=N_ROUNDS, help="trees to add")
+    parser.add_argument("--learning-rate", type=float, default=None, help="default: the model's own")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--meta", default=META_PATH)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--retune-threshold", action="store_true",
+                        help="pick the threshold again on the delta's hold-out rows")
+    parser.add_argument("--target-recall", type=float, default=TARGET_RECALL)
+    parser.add_argument("--beta", type=float, default=F_BETA)
+    parser.add_argument("--promote", action="store_true", help=f"install as {MODEL_PATH} / {META_PATH}")
+    parser.add_argument("--force", action="store_true", help="promote even if hold-out PR-AUC drops")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pipe = load_pipeline(args.model, args.meta)
+    parent_version = file_sha256(args.model)[:12]
+    with open(args.meta) as f:
+        parent_meta = json.load(f)
+
+    X, y = load_data(args.data)
+    if y.nunique() < 2 or y.value_counts().min() < 2:
+        raise SystemExit("❌ The new data needs at least 2 rows of each class (stroke 0 and 1) "
+                         "to split off a hold-out")
+    X_fit, X_hold, y_fit, y_hold = train_test_split(
+        X, y, stratify=y, test_size=TEST_SIZE, random_state=RANDOM_STATE
+    )
+    print(f"📥 {len(y):,} new rows ({int(y.sum())} positive): {len(y_fit):,} to fit, {len(y_hold):,} hold-out")
+
+    updated = warm_start(pipe, X_fit, y_fit, args.rounds, args.learning_rate)
+    probs = updated.predict_proba(X_hold)[:, 1]
+    ap_before = average_precision_score(y_hold, pipe.predict_proba(X_hold)[:, 1])
+    ap_after = average_precision_score(y_hold, probs)
+    total_rounds = updated.steps[-1][1].get_booster().num_boosted_rounds()
+    seconds = time.perf_counter() - start
+    print(f"🌲 +{args.rounds} trees ({total_rounds} total) in {seconds:.1f}s; "
+          f"hold-out PR-AUC {ap_before:.4f} -> {ap_after:.4f}")
+
+    if args.retune_threshold:
+        meta = threshold_meta(y_hold, with_overrides(probs, X_hold), args.target_recall, args.beta)
+    else:
+        meta = {k: v for k, v in parent_meta.items() if k != "training"}
+        print(f"🎯 Keeping the parent's threshold {meta['threshold']:.4f}")
+    meta["training"] = {
+        "mode": "warm_start",
+        "parent_version": parent_version,
+        "data": args.data,
+        "data_sha256": file_sha256(args.data),
+        "n_rows": int(len(y)),
+        "rounds_added": args.rounds,
+        "total_rounds": total_rounds,
+        "learning_rate": args.learning_rate,
+        "holdout_pr_auc_before": ap_before,
+        "holdout_pr_auc_after": ap_after,
+        "threshold_retuned": args.retune_threshold,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seconds": seconds,
+    }
+    version, model_path, meta_path = save_versioned(updated, meta, args.output_dir)
+    print(f"✅ Saved {model_path} and {meta_path} (version {version}, parent {parent_version})")
+
+    if args.promote:
+        if ap_after < ap_before and not args.force:
+            raise SystemExit("❌ Not promoted: hold-out PR-AUC dropped (use --force to promote anyway)")
+        promote(model_path, meta_path)
+        print(f"🚀 Promoted {version} to {MODEL_PATH} / {META_PATH}")
+
+
+if __name__ == "__main__":
+    main()